@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class SkillExperienceBase(BaseModel):
@@ -34,7 +34,8 @@ class ExtractionPipeline(BaseModel):
     judgeModelId: str = Field(..., description="Model id used to judge/validate merged requirements")
 
 
-class JobExtractionInput(BaseModel):
+class JobExtractionBase(BaseModel):
+    """Fields shared by every endpoint that extracts requirements from one posting."""
     inputText: str = Field(...,
                            description="Text to extract job requirements from"
                            )
@@ -45,10 +46,49 @@ class JobExtractionInput(BaseModel):
         default=None,
         description="Optional pipeline override: run two extractors, merge, then judge",
     )
-    userProfile: UserProfile = Field(...,
-                                     description="User profile data"
+    bypassCache: bool = Field(default=False,
+                              description="Ignore cached LLM results and call the provider again"
+                              )
+
+
+class JobExtractionInput(JobExtractionBase):
+    userProfile: Optional[UserProfile] = Field(default=None,
+                                               description="User profile data"
+                                               )
+    profileId: Optional[str] = Field(default=None,
+                                     description="Id of a stored profile to use instead of userProfile"
                                      )
 
+    @model_validator(mode="after")
+    def _one_profile(self):
+        if (self.userProfile is None) == (self.profileId is None):
+            raise ValueError("Provide exactly one of userProfile and profileId")
+        return self
+
+
+class JobBatchMatchingInput(JobExtractionBase):
+    userProfiles: Optional[List[UserProfile]] = Field(default=None,
+                                                      min_length=1,
+                                                      description="User profiles to score against the posting"
+                                                      )
+    profileIds: Optional[List[str]] = Field(default=None,
+                                            min_length=1,
+                                            description="Ids of stored profiles to use instead of userProfiles"
+                                            )
+    sortByScore: bool = Field(default=False,
+                              description="Return matches ordered by descending score"
+                              )
+    topK: Optional[int] = Field(default=None,
+                                ge=1,
+                                description="Only return the k best matches (implies sortByScore)"
+                                )
+
+    @model_validator(mode="after")
+    def _one_profile_list(self):
+        if (self.userProfiles is None) == (self.profileIds is None):
+            raise ValueError("Provide exactly one of userProfiles and profileIds")
+        return self
+
 
 class SimilarityScore(BaseModel):
     score: float = Field(...,
@@ -62,3 +102,88 @@ class JobMatchingResponse(BaseModel):
                                      description="User profile data")
     similarityScore: SimilarityScore = Field(...,
                                              description="Similarity score")
+
+
+class ExtractionStreamEvent(BaseModel):
+    """One NDJSON line of /extract/stream.
+
+    ``chunk`` events arrive as each chunk finishes, then one ``requirements`` event
+    with the merged (and judged) result, then ``similarity``. A failure after the
+    stream has started is reported as a final ``error`` event.
+    """
+    event: Literal["chunk", "requirements", "similarity", "error"]
+    modelId: Optional[str] = Field(None, description="Extractor that produced a chunk event")
+    chunkIndex: Optional[int] = Field(None, description="Position of the chunk in the posting")
+    chunkCount: Optional[int] = Field(None, description="Number of chunks the extractor splits the posting into")
+    requirements: Optional[Requirements] = None
+    similarityScore: Optional[SimilarityScore] = None
+    detail: Optional[str] = None
+
+
+class ProfileMatch(BaseModel):
+    profileIndex: int = Field(...,
+                              description="Position of the profile in the request's userProfiles or profileIds")
+    profileId: Optional[str] = Field(default=None,
+                                     description="Id of the stored profile, when scored by profileIds")
+    similarityScore: SimilarityScore = Field(...,
+                                             description="Similarity score")
+
+
+class JobBatchMatchingResponse(BaseModel):
+    jobRequirements: Requirements = Field(...,
+                                          description="Job requirements")
+    matches: List[ProfileMatch] = Field(...,
+                                        description="Per-profile similarity scores")
+
+
+class JobIngestInput(JobExtractionBase):
+    jobId: str = Field(...,
+                       min_length=1,
+                       description="Caller-assigned id; ingesting an existing id replaces it")
+
+
+class JobIngestResponse(BaseModel):
+    jobId: str = Field(...,
+                       description="Id of the stored job")
+    jobRequirements: Requirements = Field(...,
+                                          description="Job requirements")
+
+
+class JobRankingInput(BaseModel):
+    userProfile: Optional[UserProfile] = Field(default=None,
+                                               description="User profile data"
+                                               )
+    profileId: Optional[str] = Field(default=None,
+                                     description="Id of a stored profile to use instead of userProfile"
+                                     )
+    topK: int = Field(default=10,
+                      ge=1,
+                      le=1000,
+                      description="Number of best-matching jobs to return")
+
+    @model_validator(mode="after")
+    def _one_profile(self):
+        if (self.userProfile is None) == (self.profileId is None):
+            raise ValueError("Provide exactly one of userProfile and profileId")
+        return self
+
+
+class JobMatch(BaseModel):
+    jobId: str = Field(...,
+                       description="Id of the stored job")
+    similarityScore: SimilarityScore = Field(...,
+                                             description="Similarity score")
+
+
+class JobRankingResponse(BaseModel):
+    matches: List[JobMatch] = Field(...,
+                                    description="Best-matching jobs, highest score first")
+
+
+class ProfileResponse(BaseModel):
+    profileId: str = Field(...,
+                           description="Id of the stored profile")
+    userProfile: UserProfile = Field(...,
+                                     description="User profile data")
+    encodedItems: int = Field(default=0,
+                              description="Items that had to be embedded; unchanged items reuse stored embeddings")
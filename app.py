@@ -1,25 +1,129 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 import os
 
 from fastapi import Depends
 from fastapi import FastAPI, HTTPException, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from api_schema import JobExtractionInput, JobMatchingResponse
-from external_model import get_extractor_for
-from similarity_search import compute_similarity
-from utils import merge_requirements
+from api_schema import (
+    ExtractionStreamEvent,
+    JobBatchMatchingInput,
+    JobBatchMatchingResponse,
+    JobExtractionInput,
+    JobIngestInput,
+    JobIngestResponse,
+    JobMatch,
+    JobMatchingResponse,
+    JobRankingInput,
+    JobRankingResponse,
+    ProfileMatch,
+    ProfileResponse,
+    SimilarityScore,
+    UserProfile,
+)
+import embedding_pool
+from embedding_pool import EmbeddingPoolBusy, get_embedding_pool
+from external_model import EXTERNAL_MODELS_CONFIG, get_api_base_url, get_extractor_for
+import http_transport
+from job_index import get_job_index, weighted_maxsim
+import llm_cache
+import metrics
+from profile_store import get_profile_store
+from similarity_search import (
+    DEFAULT_WEIGHTS,
+    MODEL_NAME,
+    check_backend,
+    compute_similarity,
+    compute_similarity_batch,
+    dedupe_requirements,
+    encode_fields,
+    encode_items,
+    get_model,
+)
+from utils import merge_chunk_requirements, merge_requirements
+
+
+# Warm-up state of each component /readyz waits for: "pending", "ready" or "failed: <error>".
+_readiness = {}
+
+
+async def _warm_up_embedding_model():
+    pool = get_embedding_pool()
+    if pool is not None:
+        await pool.warm_up()
+    else:
+        await asyncio.to_thread(lambda: get_model().encode(["warm-up"]))
+
+
+def _warm_up_extractors():
+    configured = os.getenv("WARMUP_EXTRACTORS")
+    if configured is None:
+        model_ids = list(EXTERNAL_MODELS_CONFIG)
+    else:
+        model_ids = [model_id.strip() for model_id in configured.split(",") if model_id.strip()]
+    for model_id in model_ids:
+        # Builds the clients and loads the tokenizer by chunking a short text; no provider call is made.
+        get_extractor_for(model_id)._chunks("warm-up")
+
+
+async def _reencode_stale(store):
+    """Encode items a store holds with vectors of another embedding backend again.
+
+    Encoding runs outside the store's lock, in the embedding pool when one is configured.
+    """
+    for item_id, items in await asyncio.to_thread(store.stale):
+        embeddings = await _embedding_work(encode_fields, items)
+        await asyncio.to_thread(store.reencode, item_id, items, embeddings)
+
+
+async def _warm_up():
+    async def run(component, warm_up):
+        try:
+            await warm_up()
+            _readiness[component] = "ready"
+        except Exception as e:
+            print(f"Warm-up of {component} failed: {e}")
+            _readiness[component] = f"failed: {e}"
+
+    async def prewarm_connections():
+        # Open provider connections before the first request needs them.
+        connections = int(os.getenv("LLM_HTTP_PREWARM_CONNECTIONS", "0"))
+        if connections > 0:
+            await http_transport.prewarm(get_api_base_url(), connections)
+
+    async def reencode_stored_jobs():
+        try:
+            await _reencode_stale(await asyncio.to_thread(get_job_index))
+        except Exception as e:
+            print(f"Re-encoding stored jobs failed: {e}")
+
+    await asyncio.gather(
+        run("embedding_model", _warm_up_embedding_model),
+        run("extractors", lambda: asyncio.to_thread(_warm_up_extractors)),
+        prewarm_connections(),
+        reencode_stored_jobs(),
+    )
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    try:
-        from similarity_search import get_model
+    # Models load in the background: the server accepts connections (and answers
+    # /healthz) right away, and /readyz reports when warm-up has finished. A missing
+    # embedding backend is a deployment error, so it fails startup instead.
+    check_backend()
+    _readiness.clear()
+    _readiness.update(embedding_model="pending", extractors="pending")
+    warm_up = asyncio.create_task(_warm_up())
 
-        get_model()
-    except Exception:
-        pass
     yield
+    warm_up.cancel()
+    with suppress(asyncio.CancelledError):
+        await warm_up
+    await http_transport.aclose()
+    await asyncio.to_thread(embedding_pool.shutdown)
 
 
 app = FastAPI(lifespan=lifespan)
@@ -43,36 +147,314 @@ def _require_token(credentials: HTTPAuthorizationCredentials | None = Depends(_s
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid token")
 
 
+async def _gather_or_cancel(*aws):
+    """Await coroutines concurrently; results keep argument order.
+
+    If any of them fails, the others are cancelled and the first error is re-raised as-is.
+    """
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(aw) for aw in aws]
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0]
+    return [task.result() for task in tasks]
+
+
 @app.get("/healthz")
 async def healthz():
+    """Liveness: the process is up and serving requests."""
     return {"status": "ok"}
 
 
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once the embedding model and extractors have loaded and run a warm-up call, else 503."""
+    ready = bool(_readiness) and all(state == "ready" for state in _readiness.values())
+    body = {"status": "ready" if ready else "not ready", "components": dict(_readiness)}
+    return JSONResponse(body, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@app.get("/metrics", dependencies=[Depends(_require_token)])
+async def prometheus_metrics():
+    """Prometheus exposition of the stage latencies and counters in metrics.py."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+async def _embedding_work(fn, *args):
+    """Run embedding/scoring ``fn`` off the event loop: in the embedding worker pool when
+    EMBEDDING_WORKERS is set, else on a thread. Pool mode needs a module-level ``fn``."""
+    pool = get_embedding_pool()
+    if pool is None:
+        return await asyncio.to_thread(fn, *args)
+    return await pool.run(fn, *args)
+
+
+async def _stored_profiles(profile_ids):
+    """``(profile, embeddings)`` of each stored profile; 404 for unknown ids.
+
+    Called before extraction, so an unknown id costs no LLM calls.
+    """
+    store = await asyncio.to_thread(get_profile_store)
+
+    def read():
+        return [store.get_with_embeddings(profile_id) for profile_id in profile_ids]
+
+    stored = await asyncio.to_thread(read)
+    if any(profile is not None and embeddings is None for profile, embeddings in stored):
+        # Stored with another embedding backend.
+        await _reencode_stale(store)
+        stored = await asyncio.to_thread(read)
+    unknown = [profile_id for profile_id, (profile, _) in zip(profile_ids, stored) if profile is None]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown profile id: {', '.join(unknown)}")
+    return stored
+
+
+async def _score_stored_profiles(stored, requirements):
+    """Score stored profiles by their precomputed embeddings; only the requirements are encoded."""
+    job_embeddings = await _embedding_work(encode_fields, requirements)
+    return await asyncio.to_thread(lambda: [
+        SimilarityScore(score=weighted_maxsim(embeddings, job_embeddings, DEFAULT_WEIGHTS))
+        for _, embeddings in stored
+    ])
+
+
+def _extractor_ids(input: JobExtractionInput):
+    """Model ids whose extractions are merged for ``input``: one model, or the pipeline's extractors."""
+    if input.extractionPipeline is None:
+        return [input.modelId]
+    extractor_ids = input.extractionPipeline.extractorModelIds
+    if len(extractor_ids) < 2:
+        raise ValueError("extractionPipeline.extractorModelIds must contain at least 2 items")
+    return extractor_ids[:2]
+
+
+async def _dedupe(requirements):
+    """Collapse near-duplicate items when REQUIREMENT_DEDUP_THRESHOLD is set (cosine similarity, 0 = off)."""
+    threshold = float(os.getenv("REQUIREMENT_DEDUP_THRESHOLD", "0"))
+    if threshold <= 0:
+        return requirements
+    return await _embedding_work(dedupe_requirements, requirements, threshold)
+
+
+async def _extract(input: JobExtractionInput):
+    """Run the single-model or two-extractor + judge pipeline for ``input.inputText``."""
+    extractor_ids = _extractor_ids(input)
+    if input.extractionPipeline is not None:
+        extractor_a = get_extractor_for(extractor_ids[0])
+        extractor_b = get_extractor_for(extractor_ids[1])
+        req_a, req_b = await _gather_or_cancel(
+            extractor_a.process_text_async(input.inputText),
+            extractor_b.process_text_async(input.inputText),
+        )
+        # Deduping before the judge keeps repeats out of its prompt.
+        merged = await _dedupe(merge_requirements(req_a, req_b))
+
+        judge = get_extractor_for(input.extractionPipeline.judgeModelId)
+        return await _dedupe(await judge.judge_requirements_async(input.inputText, merged))
+
+    model = get_extractor_for(input.modelId)
+    return await _dedupe(await model.process_text_async(input.inputText))
+
+
+async def _extract_stream(input: JobExtractionInput, extractors):
+    """Yield ``chunk`` events from every extractor as they finish, then the merged ``requirements`` event."""
+    queue = asyncio.Queue()
+
+    async def run(model_id, extractor):
+        all_requirements = []
+        async for index, count, requirements in extractor.process_text_stream(input.inputText):
+            all_requirements.append(requirements)
+            await queue.put(ExtractionStreamEvent(event="chunk", modelId=model_id, chunkIndex=index,
+                                                  chunkCount=count, requirements=requirements))
+        return merge_chunk_requirements(all_requirements)
+
+    async def run_all():
+        try:
+            return await _gather_or_cancel(*(run(model_id, extractor) for model_id, extractor in extractors))
+        finally:
+            await queue.put(None)
+
+    # The task copies the current context, so the cache bypass applies to every chunk call.
+    with llm_cache.bypass(input.bypassCache):
+        task = asyncio.create_task(run_all())
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+        per_extractor = await task
+    finally:
+        task.cancel()
+
+    if input.extractionPipeline is None:
+        requirements = per_extractor[0]
+    else:
+        merged = await _dedupe(merge_requirements(*per_extractor))
+        judge = get_extractor_for(input.extractionPipeline.judgeModelId)
+        with llm_cache.bypass(input.bypassCache):
+            requirements = await judge.judge_requirements_async(input.inputText, merged)
+    requirements = await _dedupe(requirements)
+    yield ExtractionStreamEvent(event="requirements", requirements=requirements)
+
+
 @app.post("/extract", response_model=JobMatchingResponse, dependencies=[Depends(_require_token)])
 async def extract_requirements(input: JobExtractionInput,
                                response: Response,
                                ):
+    stored = await _stored_profiles([input.profileId]) if input.profileId is not None else None
     try:
-        if input.extractionPipeline is not None:
-            extractor_ids = input.extractionPipeline.extractorModelIds
-            if len(extractor_ids) < 2:
-                raise ValueError("extractionPipeline.extractorModelIds must contain at least 2 items")
-
-            req_a = get_extractor_for(extractor_ids[0]).process_text(input.inputText)
-            req_b = get_extractor_for(extractor_ids[1]).process_text(input.inputText)
-            merged = merge_requirements(req_a, req_b)
-
-            judge = get_extractor_for(input.extractionPipeline.judgeModelId)
-            requirements = judge.judge_requirements(input.inputText, merged)
-        else:
-            model = get_extractor_for(input.modelId)
-            requirements = model.process_text(input.inputText)
+        with llm_cache.bypass(input.bypassCache):
+            requirements = await _extract(input)
 
-        score = compute_similarity(input.userProfile, requirements)
+        # Embedding + cosine scoring is CPU-bound; keep it off the event loop.
+        with metrics.timed("similarity", MODEL_NAME):
+            if stored is None:
+                score = await _embedding_work(compute_similarity, input.userProfile, requirements)
+            else:
+                [score] = await _score_stored_profiles(stored, requirements)
         response.status_code = status.HTTP_200_OK
         return JobMatchingResponse(jobRequirements=requirements,
-                                   userProfile=input.userProfile,
+                                   userProfile=input.userProfile if stored is None else stored[0][0],
                                    similarityScore=score)
 
+    except EmbeddingPoolBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/extract/stream", dependencies=[Depends(_require_token)])
+async def extract_requirements_stream(input: JobExtractionInput):
+    """/extract as newline-delimited JSON: per-chunk results, the merged result, then the score.
+
+    Errors raised before the first byte (unknown model, bad pipeline) return 500 as
+    usual; later ones end the stream with an ``error`` event.
+    """
+    stored = await _stored_profiles([input.profileId]) if input.profileId is not None else None
+    try:
+        extractors = [(model_id, get_extractor_for(model_id)) for model_id in _extractor_ids(input)]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        try:
+            requirements = None
+            async for event in _extract_stream(input, extractors):
+                if event.event == "requirements":
+                    requirements = event.requirements
+                yield event.model_dump_json(exclude_none=True) + "\n"
+
+            with metrics.timed("similarity", MODEL_NAME):
+                if stored is None:
+                    score = await _embedding_work(compute_similarity, input.userProfile, requirements)
+                else:
+                    [score] = await _score_stored_profiles(stored, requirements)
+            yield ExtractionStreamEvent(event="similarity", similarityScore=score).model_dump_json(exclude_none=True) + "\n"
+
+        except Exception as e:
+            yield ExtractionStreamEvent(event="error", detail=str(e)).model_dump_json(exclude_none=True) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/extract/batch", response_model=JobBatchMatchingResponse, dependencies=[Depends(_require_token)])
+async def extract_requirements_batch(input: JobBatchMatchingInput):
+    """Extract a posting once and score it against every profile in the request."""
+    stored = await _stored_profiles(input.profileIds) if input.profileIds is not None else None
+    try:
+        with llm_cache.bypass(input.bypassCache):
+            requirements = await _extract(input)
+
+        with metrics.timed("similarity", MODEL_NAME):
+            if stored is None:
+                scores = await _embedding_work(compute_similarity_batch, input.userProfiles, requirements)
+            else:
+                scores = await _score_stored_profiles(stored, requirements)
+        profile_ids = input.profileIds or [None] * len(scores)
+        matches = [ProfileMatch(profileIndex=i, profileId=profile_id, similarityScore=score)
+                   for i, (profile_id, score) in enumerate(zip(profile_ids, scores))]
+        if input.sortByScore or input.topK is not None:
+            matches.sort(key=lambda m: m.similarityScore.score, reverse=True)
+        if input.topK is not None:
+            matches = matches[:input.topK]
+
+        return JobBatchMatchingResponse(jobRequirements=requirements, matches=matches)
+
+    except EmbeddingPoolBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/jobs", response_model=JobIngestResponse, dependencies=[Depends(_require_token)])
+async def ingest_job(input: JobIngestInput):
+    """Extract a posting and store its requirements and embeddings in the job index."""
+    try:
+        with llm_cache.bypass(input.bypassCache):
+            requirements = await _extract(input)
+
+        embeddings = await _embedding_work(encode_fields, requirements)
+        await asyncio.to_thread(lambda: get_job_index().add(input.jobId, requirements, embeddings))
+        return JobIngestResponse(jobId=input.jobId, jobRequirements=requirements)
+
+    except EmbeddingPoolBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(_require_token)])
+async def delete_job(job_id: str):
+    if not await asyncio.to_thread(lambda: get_job_index().remove(job_id)):
+        raise HTTPException(status_code=404, detail=f"Unknown job id: {job_id}")
+
+
+@app.post("/jobs/rank", response_model=JobRankingResponse, dependencies=[Depends(_require_token)])
+async def rank_jobs(input: JobRankingInput):
+    """Return the stored jobs that best match a profile, by the same weighted MaxSim as /extract."""
+    stored = await _stored_profiles([input.profileId]) if input.profileId is not None else None
+    try:
+        if stored is None:
+            embeddings = await _embedding_work(encode_fields, input.userProfile)
+        else:
+            embeddings = stored[0][1]
+        # Jobs another backend embedded (e.g. written by a differently configured worker).
+        await _reencode_stale(await asyncio.to_thread(get_job_index))
+        ranked = await asyncio.to_thread(lambda: get_job_index().search(embeddings, input.topK, DEFAULT_WEIGHTS))
+        return JobRankingResponse(matches=[
+            JobMatch(jobId=job_id, similarityScore=SimilarityScore(score=score)) for job_id, score in ranked
+        ])
+
+    except EmbeddingPoolBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.put("/profiles/{profile_id}", response_model=ProfileResponse, dependencies=[Depends(_require_token)])
+async def put_profile(profile_id: str, profile: UserProfile):
+    """Create or replace a stored profile. Only item texts it did not contain before are embedded."""
+    try:
+        store = await asyncio.to_thread(get_profile_store)
+        vectors = {}
+        while missing := await asyncio.to_thread(store.put, profile_id, profile, vectors):
+            vectors.update(zip(missing, await _embedding_work(encode_items, missing)))
+        return ProfileResponse(profileId=profile_id, userProfile=profile, encodedItems=len(vectors))
+
+    except EmbeddingPoolBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/profiles/{profile_id}", response_model=ProfileResponse, dependencies=[Depends(_require_token)])
+async def get_profile(profile_id: str):
+    profile = await asyncio.to_thread(lambda: get_profile_store().get(profile_id))
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile id: {profile_id}")
+    return ProfileResponse(profileId=profile_id, userProfile=profile)
+
+
+@app.delete("/profiles/{profile_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(_require_token)])
+async def delete_profile(profile_id: str):
+    if not await asyncio.to_thread(lambda: get_profile_store().remove(profile_id)):
+        raise HTTPException(status_code=404, detail=f"Unknown profile id: {profile_id}")
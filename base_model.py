@@ -1,7 +1,21 @@
-from collections import defaultdict
+import asyncio
+import os
 
 from api_schema import Requirements
-from utils import chunk_markdown
+from batching import MicroBatcher
+import llm_cache
+import metrics
+from single_flight import SingleFlight
+from utils import (
+    chunk_markdown,
+    chunk_sections,
+    clean_llm_response,
+    iter_chunks_as_completed,
+    load_template,
+    load_token_counter,
+    map_chunks,
+    merge_chunk_requirements,
+)
 
 # Local (self-hosted) model registry. Keys are user-facing model ids passed in requests.
 MODELS_CONFIG = {
@@ -9,7 +23,12 @@ MODELS_CONFIG = {
     "qwen3-8b": {
         "model_id": "qwen/qwen3-8b",  # HF-style id (not used in unit tests)
         "chunk_size": 12000,
+        "tokenizer": "Qwen/Qwen3-8B",
         "device_kwargs": None,
+        # Chunk calls in flight; the batcher groups them into one generate() batch.
+        "max_concurrency": 8,
+        "max_batch_size": 8,
+        "max_new_tokens": 1024,
     }
 }
 
@@ -17,34 +36,129 @@ _MODEL_INSTANCES = {}
 
 
 class LLMExtractor:
-    def __init__(self, model_id, chunk_size, device_kwargs=None):
+    def __init__(self, model_id, chunk_size, device_kwargs=None, max_concurrency=None,
+                 tokenizer=None, chunk_overlap=None, max_batch_size=None, max_new_tokens=1024,
+                 section_size=None):
         self.model_id = model_id
         self.chunk_size = chunk_size
+        self.tokenizer = tokenizer
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else int(os.getenv("LLM_CHUNK_OVERLAP_TOKENS", "0"))
+        # Incremental extraction: a positive size switches to content-defined chunks of at most
+        # this many tokens, so an edited posting only misses the LLM cache for the edited part.
+        self.section_size = section_size if section_size is not None else int(os.getenv("LLM_SECTION_TOKENS", "0"))
+        self._flights = SingleFlight(on_coalesce=metrics.COALESCED.labels(model=model_id).inc)
         self.device_kwargs = device_kwargs
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CHUNK_CONCURRENCY", "4"))
+        self.max_batch_size = max_batch_size or int(os.getenv("LLM_LOCAL_MAX_BATCH_SIZE", "8"))
+        self.max_new_tokens = max_new_tokens
+        self.generator = None
+        self._batcher = None
         self._load_model()
 
     def _load_model(self):
-        # Real implementation lives in production; unit tests monkeypatch this.
-        pass
+        """Load the model and start the batcher that groups chunk prompts from all callers."""
+        from local_llm import PrefixCachedGenerator
 
-    def process_text(self, text):
-        chunks = chunk_markdown(text, self.chunk_size)
-        all_requirements = []
-        for chunk in chunks:
-            req = self.process_chunk(chunk)
-            all_requirements.append(req)
+        # Everything before the chunk is identical across prompts; its KV cache is computed once.
+        sentinel = "\x00CHUNK\x00"
+        prefix = self._chunk_prompt(sentinel).split(sentinel)[0]
+        self.generator = PrefixCachedGenerator(self.model_id, prompt_prefix=prefix,
+                                               device_kwargs=self.device_kwargs, max_new_tokens=self.max_new_tokens)
+        self._batcher = MicroBatcher(
+            self._generate_batch,
+            max_batch_size=self.max_batch_size,
+            max_wait_ms=float(os.getenv("LLM_LOCAL_BATCH_WAIT_MS", "20")),
+            name="local-llm-batcher",
+        )
+
+    def _chunk_prompt(self, chunk):
+        return load_template("prompt_template.txt")(chunk=chunk)
+
+    def _generate_batch(self, prompts):
+        responses = []
+        # A single long posting can queue more chunks than one batch should hold.
+        for start in range(0, len(prompts), self.max_batch_size):
+            batch = prompts[start:start + self.max_batch_size]
+            with metrics.timed("llm_call", self.model_id):
+                responses.extend(self.generator.generate(batch))
+            for prompt in batch:
+                metrics.PROMPT_CHARS.labels(model=self.model_id).observe(len(prompt))
+        for response in responses:
+            metrics.RESPONSE_CHARS.labels(model=self.model_id).observe(len(response))
+        return responses
+
+    def _parse(self, response, key) -> Requirements:
+        try:
+            result = Requirements.model_validate_json(clean_llm_response(response))
+        except Exception as e:
+            print(f"Error parsing local model response: {e}")
+            metrics.LLM_FALLBACKS.labels(model=self.model_id, kind="chunk").inc()
+            return Requirements()
+        llm_cache.store(key, result)
+        return result
+
+    def _chunks(self, text):
+        count_tokens = load_token_counter(self.tokenizer)
+        with metrics.timed("chunking", self.model_id):
+            if self.section_size > 0:
+                chunks = chunk_sections(text, min(self.section_size, self.chunk_size), count_tokens=count_tokens)
+            else:
+                chunks = chunk_markdown(text, self.chunk_size, count_tokens=count_tokens, overlap=self.chunk_overlap)
+        metrics.CHUNKS_PER_TEXT.labels(model=self.model_id).observe(len(chunks))
+        return chunks
+
+    def process_text(self, text, max_concurrency=None):
+        with metrics.timed("extraction", self.model_id):
+            chunks = self._chunks(text)
+            return merge_chunk_requirements(self.process_chunks(chunks, max_concurrency))
+
+    def process_chunks(self, chunks, max_concurrency=None):
+        """Extract every chunk; results keep chunk order.
+
+        With the model loaded the chunks go through the batcher, so they are generated
+        together with chunks queued by concurrent requests.
+        """
+        if self._batcher is None:
+            return map_chunks(self.process_chunk, chunks, max_concurrency or self.max_concurrency)
+
+        prompts = [self._chunk_prompt(chunk) for chunk in chunks]
+        # Greedy decoding is deterministic, so results are cached like the external models'.
+        keys = [llm_cache.make_key(self.model_id, prompt, 0.0) for prompt in prompts]
+        results = [llm_cache.lookup(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            responses = self._batcher.submit([prompts[i] for i in missing])
+            for i, response in zip(missing, responses):
+                results[i] = self._parse(response, keys[i])
+        return results
+
+    async def process_chunks_async(self, chunks, max_concurrency=None):
+        return await asyncio.to_thread(self.process_chunks, chunks, max_concurrency)
+
+    async def process_text_async(self, text, max_concurrency=None):
+        # Local inference is blocking; keep it off the event loop. Concurrent calls
+        # for the same text share one run.
+        return await self._flights.do(
+            ("text", text, llm_cache.bypassed()),
+            lambda: asyncio.to_thread(self.process_text, text, max_concurrency),
+        )
+
+    async def process_text_stream(self, text, max_concurrency=None):
+        """Yield ``(chunk_index, chunk_count, Requirements)`` for each chunk as soon as it is extracted."""
+        # Tokenizing (and loading the tokenizer on first use) blocks; keep it off the event loop.
+        chunks = await asyncio.to_thread(self._chunks, text)
 
-        merged = defaultdict(set)
-        for req in all_requirements:
-            merged["skills"].update(req.skills)
-            merged["experiences"].update(req.experiences)
-            merged["qualifications"].update(req.qualifications)
+        async def run(chunk):
+            return await asyncio.to_thread(self.process_chunk, chunk)
 
-        unique_requirements = {k: sorted(list(v)) for k, v in merged.items()}
-        return Requirements(**unique_requirements)
+        async for index, requirements in iter_chunks_as_completed(
+                run, chunks, max_concurrency or self.max_concurrency):
+            yield index, len(chunks), requirements
 
     def process_chunk(self, chunk) -> Requirements:
-        return Requirements()
+        if self._batcher is None:
+            return Requirements()
+        return self.process_chunks([chunk])[0]
 
 
 def get_extractor_for(model_key):
@@ -58,6 +172,11 @@ def get_extractor_for(model_key):
             model_id=config["model_id"],
             chunk_size=config["chunk_size"],
             device_kwargs=config.get("device_kwargs"),
+            max_concurrency=config.get("max_concurrency"),
+            tokenizer=config.get("tokenizer"),
+            section_size=config.get("section_size"),
+            max_batch_size=config.get("max_batch_size"),
+            max_new_tokens=config.get("max_new_tokens", 1024),
         )
 
     return _MODEL_INSTANCES[model_key]
@@ -0,0 +1,105 @@
+from concurrent.futures import Future
+import threading
+import time
+from typing import Dict, List
+
+
+class MicroBatcher:
+    """Coalesces requests from concurrent callers into larger calls of ``process``.
+
+    ``process`` maps a list of distinct items to an indexable sequence of results in
+    the same order. Callers block in submit(); a background thread flushes the queue
+    as one batch once ``max_batch_size`` items are waiting or the oldest request has
+    waited ``max_wait_ms``, then hands each caller its own results.
+    """
+
+    def __init__(self, process, max_batch_size: int = 256, max_wait_ms: float = 5.0, name: str = "micro-batcher"):
+        self._process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []
+        self._pending_items = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: List):
+        """Block until the batch holding ``items`` has run; returns their results."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{type(self).__name__} is closed")
+            self._pending.append((list(items), future, time.monotonic()))
+            self._pending_items += len(items)
+            self._cond.notify()
+        return future.result()
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+            deadline = self._pending[0][2] + self.max_wait
+            while self._pending_items < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, size = [], 0
+            # Always take at least one request, even if it alone exceeds the batch size.
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch_size):
+                request = self._pending.pop(0)
+                batch.append(request)
+                size += len(request[0])
+            self._pending_items -= size
+            return batch
+
+    def _select(self, results, rows: List[int]):
+        """Results of one request, given its rows in the batch."""
+        return [results[row] for row in rows]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            items = list(dict.fromkeys(item for request_items, _, _ in batch for item in request_items))
+            try:
+                results = self._process(items) if items else None
+                row_of = {item: i for i, item in enumerate(items)}
+                for request_items, future, _ in batch:
+                    future.set_result(self._select(results, [row_of[item] for item in request_items]))
+            except Exception as e:
+                # Fail the callers still waiting instead of leaving them blocked; the thread keeps serving.
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            with self._cond:
+                self.batches += 1
+                self.items += len(items)
+                self.largest_batch = max(self.largest_batch, len(items))
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "queue_depth": len(self._pending),
+                "queued_items": self._pending_items,
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -0,0 +1,207 @@
+"""Micro-benchmarks for the pure hot paths, compared against a stored baseline.
+
+    python benchmarks/run_benchmarks.py                  # compare with baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline  # record a new baseline
+
+Runs offline: embeddings come from a deterministic hashing encoder unless
+--embedding-model=real is given (which needs the model in the local HF cache).
+Baselines are machine-specific; record one on the machine that runs the comparison.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+# Single-threaded BLAS keeps small-matrix timings stable from run to run.
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np  # noqa: E402
+
+from api_schema import Requirements, UserProfile  # noqa: E402
+from similarity_search import compute_maxsim, compute_similarity  # noqa: E402
+from utils import chunk_markdown, merge_chunk_requirements, merge_requirements  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+POSTING_SIZES = {"short": 2_000, "50kb": 50_000, "500kb": 500_000}
+ITEM_COUNTS = [10, 100, 500]
+
+_WORDS = ("python java kubernetes docker terraform aws azure spark kafka sql postgres react "
+          "typescript design testing agile mentoring leadership ownership communication degree "
+          "bachelor master experience years backend frontend platform security data pipelines").split()
+
+
+class HashingEncoder:
+    """Deterministic stand-in for the sentence embedding model (384-dim, MiniLM's width).
+
+    Vectors are memoized, so after the warm-up call the benchmarks time the scoring
+    code around the model rather than the stand-in itself.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self._vectors = {}
+
+    def _vector(self, text):
+        vector = self._vectors.get(text)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = self._vectors[text] = np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+        return vector
+
+    def encode(self, texts):
+        return np.stack([self._vector(text) for text in texts]) if texts else np.empty((0, self.dim), np.float32)
+
+
+def make_posting(size_chars: int, rng: random.Random) -> str:
+    """Markdown posting of roughly ``size_chars`` characters: headings, paragraphs and bullet lists."""
+    parts, length, section = [], 0, 0
+    while length < size_chars:
+        section += 1
+        block = [f"## Section {section}\n"]
+        for _ in range(rng.randint(1, 3)):
+            sentences = [" ".join(rng.choices(_WORDS, k=rng.randint(6, 18))).capitalize() + "."
+                         for _ in range(rng.randint(2, 6))]
+            block.append(" ".join(sentences) + "\n\n")
+        block.extend(f"- {' '.join(rng.choices(_WORDS, k=rng.randint(2, 6)))}\n" for _ in range(rng.randint(3, 8)))
+        block.append("\n")
+        text = "".join(block)
+        parts.append(text)
+        length += len(text)
+    return "".join(parts)[:size_chars]
+
+
+def make_items(count: int, rng: random.Random, prefix: str):
+    return [f"{prefix} {i}: {' '.join(rng.choices(_WORDS, k=rng.randint(2, 6)))}" for i in range(count)]
+
+
+def make_requirements(count: int, rng: random.Random, prefix: str) -> Requirements:
+    per_field = max(1, count // 3)
+    return Requirements(
+        skills=make_items(per_field, rng, f"{prefix} skill"),
+        experiences=make_items(per_field, rng, f"{prefix} experience"),
+        qualifications=make_items(count - 2 * per_field, rng, f"{prefix} qualification"),
+    )
+
+
+def build_benchmarks(model):
+    """name -> zero-argument callable. Inputs are generated up front with a fixed seed."""
+    rng = random.Random(1234)
+    benchmarks = {}
+
+    for label, size in POSTING_SIZES.items():
+        posting = make_posting(size, rng)
+        benchmarks[f"chunk_markdown[{label}]"] = lambda posting=posting: chunk_markdown(posting, 12000)
+
+    for count in ITEM_COUNTS:
+        a = make_requirements(count, rng, "a")
+        b = make_requirements(count, rng, "b")
+        chunks = [make_requirements(count // 5 or 1, rng, f"chunk{i}") for i in range(5)]
+        user_items = make_items(count, rng, "user")
+        job_items = make_items(count, rng, "job")
+        profile = UserProfile(**make_requirements(count, rng, "user").model_dump())
+
+        benchmarks[f"merge_requirements[{count}]"] = lambda a=a, b=b: merge_requirements(a, b)
+        benchmarks[f"merge_chunk_requirements[{count}]"] = lambda chunks=chunks: merge_chunk_requirements(chunks)
+        benchmarks[f"compute_maxsim[{count}]"] = (
+            lambda u=user_items, j=job_items: compute_maxsim(u, j, model))
+        benchmarks[f"compute_similarity[{count}]"] = (
+            lambda p=profile, r=a: compute_similarity(p, r, model=model))
+
+    return benchmarks
+
+
+def measure(fn, min_time: float = 0.3, repeats: int = 7) -> float:
+    """Best seconds per call over ``repeats`` rounds sharing ``min_time``.
+
+    The minimum is the least noisy estimate of what the code costs on an idle machine.
+    """
+    fn()  # warm up
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeats:
+            break
+        number *= 2
+
+    rounds = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+    return min(rounds)
+
+
+def find_regressions(results, baseline, threshold):
+    """(name, baseline, current) for every benchmark slower than baseline * (1 + threshold)."""
+    return [(name, baseline[name], seconds) for name, seconds in results.items()
+            if name in baseline and seconds > baseline[name] * (1 + threshold)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save-baseline", action="store_true", help="write results to the baseline file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCHMARK_THRESHOLD", "0.5")),
+                        help="allowed slowdown relative to baseline (default 0.5 = 50%%)")
+    parser.add_argument("--retries", type=int, default=3, help="re-measurements of apparent regressions")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--embedding-model", choices=["hash", "real"], default="hash")
+    args = parser.parse_args(argv)
+
+    if args.embedding_model == "real":
+        from similarity_search import get_backend, load_model
+
+        model = load_model(get_backend())
+    else:
+        model = HashingEncoder()
+
+    benchmarks = build_benchmarks(model)
+    results = {}
+    for name, fn in benchmarks.items():
+        if args.filter in name:
+            results[name] = measure(fn)
+            print(f"{name:40s} {results[name] * 1e3:10.3f} ms")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 1
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    # Re-measure apparent regressions a few times so one noisy round does not fail the run.
+    for _ in range(args.retries):
+        suspects = find_regressions(results, baseline, args.threshold)
+        if not suspects:
+            break
+        for name, _, _ in suspects:
+            results[name] = min(results[name], measure(benchmarks[name]))
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for name, before, after in regressions:
+        print(f"REGRESSION {name}: {before * 1e3:.3f} ms -> {after * 1e3:.3f} ms ({after / before - 1:+.0%})")
+    if regressions:
+        return 1
+    print(f"OK: no benchmark slower than baseline by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+from collections import OrderedDict
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+import metrics
+from utils import connect_sqlite
+
+# SQLite caps the number of bound parameters per statement on older builds.
+_SQL_BATCH = 500
+
+
+def _key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier cache of text embeddings keyed by (model name, text).
+
+    Tier 1 is a bounded in-process LRU. Tier 2 is an optional SQLite file opened in
+    WAL mode with memory-mapped reads, so every worker on the host shares one store.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+        return conn
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model_name: str, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for whichever of ``texts`` are known."""
+        found: Dict[str, np.ndarray] = {}
+        pending: Dict[str, str] = {}
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                key = _key(model_name, text)
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[text] = vector
+                    self.memory_hits += 1
+                else:
+                    pending[key] = text
+        metrics.EMBEDDING_CACHE.labels(tier="lru", result="hit").inc(len(found))
+        metrics.EMBEDDING_CACHE.labels(tier="lru", result="miss").inc(len(pending))
+
+        if pending and self.path:
+            keys = list(pending)
+            conn = self._connection()
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                with self._lock:
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[pending.pop(key)] = vector
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+            metrics.EMBEDDING_CACHE.labels(tier="sqlite", result="hit").inc(len(keys) - len(pending))
+            metrics.EMBEDDING_CACHE.labels(tier="sqlite", result="miss").inc(len(pending))
+
+        with self._lock:
+            self.misses += len(pending)
+        return found
+
+    def put_many(self, model_name: str, vectors: Dict[str, np.ndarray]) -> None:
+        rows = []
+        with self._lock:
+            for text, vector in vectors.items():
+                key = _key(model_name, text)
+                vector = np.ascontiguousarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+
+        if rows and self.path:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._lru),
+            }
+
+
+def encode_cached(texts: List[str], encode, model_name: str, cache: Optional[EmbeddingCache]) -> np.ndarray:
+    """Encode ``texts`` with ``encode`` (list[str] -> array), serving repeats from ``cache``."""
+    if cache is None:
+        return np.asarray(encode(texts), dtype=np.float32)
+
+    found = cache.get_many(model_name, texts)
+    missing = list(dict.fromkeys(t for t in texts if t not in found))
+    if missing:
+        fresh = np.asarray(encode(missing), dtype=np.float32)
+        new_vectors = dict(zip(missing, fresh))
+        cache.put_many(model_name, new_vectors)
+        found.update(new_vectors)
+    return np.stack([found[t] for t in texts])
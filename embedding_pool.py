@@ -0,0 +1,177 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from typing import Optional
+
+import numpy as np
+
+# Results are handed back through files in the shared-memory filesystem where there is one.
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+_PREFIX = "jobmatcher-emb-"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class EmbeddingPoolBusy(Exception):
+    """Raised when the pool's queue is full."""
+
+
+class _SharedArray:
+    """Picklable handle of an array a worker wrote to shared memory."""
+
+    def __init__(self, path, shape, dtype):
+        self.path = path
+        self.shape = shape
+        self.dtype = dtype
+
+
+def _export(array: np.ndarray) -> _SharedArray:
+    array = np.ascontiguousarray(array)
+    path = os.path.join(SHARED_DIR, f"{_PREFIX}{uuid.uuid4().hex}")
+    fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+    try:
+        if array.nbytes:
+            os.ftruncate(fd, array.nbytes)
+            with mmap.mmap(fd, array.nbytes) as mm:
+                mm[:] = array.tobytes()
+    finally:
+        os.close(fd)
+    return _SharedArray(path, array.shape, array.dtype.str)
+
+
+def _import(shared: _SharedArray) -> np.ndarray:
+    """Map the worker's array without copying it. The file is unlinked right away;
+    the mapping lives as long as the returned (read-only) array."""
+    try:
+        dtype = np.dtype(shared.dtype)
+        nbytes = int(np.prod(shared.shape)) * dtype.itemsize
+        if not nbytes:
+            return np.empty(shared.shape, dtype=dtype)
+        fd = os.open(shared.path, os.O_RDONLY)
+        try:
+            mm = mmap.mmap(fd, nbytes, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        return np.frombuffer(mm, dtype=dtype).reshape(shared.shape)
+    finally:
+        os.unlink(shared.path)
+
+
+def _share(result):
+    if isinstance(result, np.ndarray):
+        return _export(result)
+    if isinstance(result, dict):
+        return {key: _share(value) for key, value in result.items()}
+    return result
+
+
+def _unshare(result):
+    if isinstance(result, _SharedArray):
+        return _import(result)
+    if isinstance(result, dict):
+        return {key: _unshare(value) for key, value in result.items()}
+    return result
+
+
+def _discard(future):
+    # The caller was cancelled; still remove any shared-memory files of the result.
+    if not future.cancelled() and future.exception() is None:
+        _unshare(future.result())
+
+
+def _init_worker(model_factory, threads):
+    # One intra-op thread per worker by default: the pool scales across cores with processes.
+    if threads:
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+    import similarity_search
+
+    if model_factory is not None:
+        similarity_search._model = model_factory()
+    similarity_search.get_model()
+
+
+def _call(fn, args):
+    return _share(fn(*args))
+
+
+def _warm_up():
+    import similarity_search
+
+    similarity_search.get_model().encode(["warm-up"])
+    return os.getpid()
+
+
+class EmbeddingPool:
+    """Runs embedding and scoring functions in worker processes that each load the model.
+
+    At most ``max_queue`` calls are queued or running; further calls raise
+    EmbeddingPoolBusy instead of piling up. ndarray results (also inside dicts)
+    come back through shared memory rather than through the result pipe.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 64, model_factory=None, threads: int = 1,
+                 start_method: str = "spawn"):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(model_factory, threads),
+        )
+        self._slots = threading.BoundedSemaphore(max_queue)
+
+    async def run(self, fn, *args):
+        """Await ``fn(*args)`` in a worker. ``fn`` must be a module-level (picklable) function."""
+        if not self._slots.acquire(blocking=False):
+            raise EmbeddingPoolBusy(f"{self.max_queue} embedding calls already queued")
+        try:
+            future = self._executor.submit(_call, fn, args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the worker is done, even if the caller gives up earlier.
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            shared = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(_discard)
+            raise
+        return _unshare(shared)
+
+    async def warm_up(self):
+        """Start the workers and run one encode in them."""
+        await asyncio.gather(*(self.run(_warm_up) for _ in range(self.workers)))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def get_embedding_pool() -> Optional[EmbeddingPool]:
+    """Shared process pool; enabled when EMBEDDING_WORKERS > 0."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv("EMBEDDING_WORKERS", "0"))
+            if workers <= 0:
+                return None
+            _pool = EmbeddingPool(
+                workers=workers,
+                max_queue=int(os.getenv("EMBEDDING_WORKER_QUEUE", str(16 * workers))),
+                threads=int(os.getenv("EMBEDDING_WORKER_THREADS", "1")),
+            )
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
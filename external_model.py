@@ -1,38 +1,85 @@
-from collections import defaultdict
+import asyncio
 import os
-from pathlib import Path
-
-from openai import OpenAI
-import outlines
-from outlines import Template
+import threading
+import time
 
 from api_schema import Requirements
-from utils import chunk_markdown
+from hedging import LatencyTracker, race_with_hedge
+import http_transport
+import llm_cache
+import metrics
+from single_flight import SingleFlight
+from utils import (
+    chunk_markdown,
+    chunk_sections,
+    clean_llm_response,
+    iter_chunks_as_completed,
+    load_template,
+    load_token_counter,
+    map_chunks,
+    merge_chunk_requirements,
+)
 
 
 EXTERNAL_MODELS_CONFIG = {
     "gpt-oss-120b": {
         "model_name": "openai/gpt-oss-120b",
         "chunk_size": 12000,
+        "tokenizer": "openai/gpt-oss-120b",
     },
     "qwen3-next-80b-thinking": {
         "model_name": "qwen/qwen3-next-80b-a3b-thinking",
         "chunk_size": 12000,
+        "tokenizer": "Qwen/Qwen3-Next-80B-A3B-Thinking",
+        # Long latency tail; hedged calls (LLM_HEDGE_PERCENTILE) go to this model id instead.
+        "hedge_model": "gpt-oss-120b",
     },
     "glm4.7": {
         "model_name": "z-ai/glm4.7",
         "chunk_size": 12000,
+        "tokenizer": "zai-org/GLM-4.7",
     },
 }
 
 _MODEL_INSTANCES = {}
+_instances_lock = threading.Lock()
+
+DEFAULT_API_BASE_URL = "https://integrate.api.nvidia.com/v1"
+
+CHUNK_TEMPERATURE = 0.5
+JUDGE_TEMPERATURE = 0.0
+
+
+def get_api_base_url():
+    """Provider endpoint; EXTERNAL_LLM_API_BASE_URL points every external model elsewhere (e.g. a local fake)."""
+    return os.getenv("EXTERNAL_LLM_API_BASE_URL") or DEFAULT_API_BASE_URL
 
 
 class ExternalLLMExtractor:
-    def __init__(self, model_name, chunk_size, api_base_url=None):
+    def __init__(self, model_name, chunk_size, api_base_url=None, max_concurrency=None,
+                 tokenizer=None, chunk_overlap=None, hedge_model=None, section_size=None):
         self.model_name = model_name
         self.chunk_size = chunk_size
-        self.api_base_url = api_base_url or "https://integrate.api.nvidia.com/v1"
+        # Hugging Face tokenizer id used to count chunk tokens; None estimates from length.
+        self.tokenizer = tokenizer
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else int(os.getenv("LLM_CHUNK_OVERLAP_TOKENS", "0"))
+        # Incremental extraction: a positive size switches to content-defined chunks of at most
+        # this many tokens, so an edited posting only misses the LLM cache for the edited part.
+        self.section_size = section_size if section_size is not None else int(os.getenv("LLM_SECTION_TOKENS", "0"))
+        # Upper bound on concurrent process_chunk calls within one process_text call.
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CHUNK_CONCURRENCY", "4"))
+        # Hedging: when a call outlives this latency percentile, a duplicate goes to
+        # ``hedge_model`` (a model id; None means this model) and the first success wins.
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+        self.hedge_min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+        self.hedge_model = hedge_model
+        # Resolved from hedge_model on the first call; see _hedge_extractor().
+        self._hedge = None
+        self.latency = LatencyTracker()
+        self.hedge_counts = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+        # Identical concurrent process_text/judge calls share one provider round-trip.
+        self._flights = SingleFlight(on_coalesce=metrics.COALESCED.labels(model=model_name).inc)
+        self.api_base_url = api_base_url or get_api_base_url()
         self.api_key = os.environ["EXTERNAL_LLM_API_KEY"]
 
         if not self.api_key:
@@ -40,75 +87,226 @@ class ExternalLLMExtractor:
 
         self.client = None
         self.generator = None
+        self.async_client = None
+        self.async_generator = None
         self._load_model()
 
     def _load_model(self):
-        """Initialize the OpenAI client and outlines generator."""
-        self.client = OpenAI(base_url=self.api_base_url, api_key=self.api_key)
+        """Initialize the sync and async OpenAI clients and their outlines generators.
+
+        All extractors share the process-wide connection pools from http_transport.
+        openai and outlines are imported here rather than at module level: importing
+        them costs over a second, which app startup should not pay.
+        """
+        from openai import AsyncOpenAI, OpenAI
+        import outlines
+
+        self.client = OpenAI(base_url=self.api_base_url, api_key=self.api_key,
+                             http_client=http_transport.get_http_client())
         self.generator = outlines.from_openai(self.client, self.model_name)
+        self.async_client = AsyncOpenAI(base_url=self.api_base_url, api_key=self.api_key,
+                                        http_client=http_transport.get_async_http_client())
+        self.async_generator = outlines.from_openai(self.async_client, self.model_name)
 
-    def process_text(self, text):
-        """Process the entire text by chunking and merging results."""
-        chunks = chunk_markdown(text, self.chunk_size)
-        all_requirements = []
-        for chunk in chunks:
-            req = self.process_chunk(chunk)
-            all_requirements.append(req)
+    def _chunks(self, text):
+        count_tokens = load_token_counter(self.tokenizer)
+        with metrics.timed("chunking", self.model_name):
+            if self.section_size > 0:
+                chunks = chunk_sections(text, min(self.section_size, self.chunk_size), count_tokens=count_tokens)
+            else:
+                chunks = chunk_markdown(text, self.chunk_size, count_tokens=count_tokens, overlap=self.chunk_overlap)
+        metrics.CHUNKS_PER_TEXT.labels(model=self.model_name).observe(len(chunks))
+        return chunks
 
-        # Merge all requirements from chunks
-        merged = defaultdict(set)
-        for req in all_requirements:
-            merged["skills"].update(req.skills)
-            merged["experiences"].update(req.experiences)
-            merged["qualifications"].update(req.qualifications)
+    def _chunk_prompt(self, chunk):
+        return load_template("prompt_template.txt")(chunk=chunk)
 
-        unique_requirements = {k: sorted(list(v)) for k, v in merged.items()}
-        return Requirements(**unique_requirements)
+    def _judge_prompt(self, input_text, requirements):
+        return load_template("prompt_judge_template.txt")(
+            input_text=input_text,
+            requirements_json=requirements.model_dump_json(),
+        )
 
-    def process_chunk(self, chunk) -> Requirements:
-        """Process a single chunk using the template and external API."""
-        current_dir = Path(__file__).resolve().parent
-        template_path = current_dir / "prompt_template.txt"
-        template = Template.from_file(str(template_path))
-        prompt = template(chunk=chunk)
+    def process_text(self, text, max_concurrency=None):
+        """Process the entire text by chunking and merging results.
 
-        try:
+        Chunks are extracted concurrently, at most ``max_concurrency`` at a time
+        (defaults to the extractor's limit); the merge stays sorted and deterministic.
+        """
+        with metrics.timed("extraction", self.model_name):
+            chunks = self._chunks(text)
+            return merge_chunk_requirements(self.process_chunks(chunks, max_concurrency))
+
+    def process_chunks(self, chunks, max_concurrency=None):
+        """Extract every chunk, at most ``max_concurrency`` provider calls at a time; results keep chunk order."""
+        return map_chunks(self.process_chunk, chunks, max_concurrency or self.max_concurrency)
+
+    async def process_chunks_async(self, chunks, max_concurrency=None):
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def run(chunk):
+            async with semaphore:
+                return await self.process_chunk_async(chunk)
+
+        return await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+    async def process_text_async(self, text, max_concurrency=None):
+        """Async counterpart of process_text; chunk calls share one bounded fan-out.
+
+        Concurrent calls for the same text join the extraction already in flight.
+        """
+        return await self._flights.do(("text", text, llm_cache.bypassed()),
+                                      lambda: self._process_text_async(text, max_concurrency))
+
+    async def _process_text_async(self, text, max_concurrency=None):
+        with metrics.timed("extraction", self.model_name):
+            all_requirements = [req async for _, _, req in self.process_text_stream(text, max_concurrency)]
+            return merge_chunk_requirements(all_requirements)
+
+    async def process_text_stream(self, text, max_concurrency=None):
+        """Yield ``(chunk_index, chunk_count, Requirements)`` for each chunk as soon as it is extracted."""
+        # Tokenizing (and loading the tokenizer on first use) blocks; keep it off the event loop.
+        chunks = await asyncio.to_thread(self._chunks, text)
+        async for index, requirements in iter_chunks_as_completed(
+                self.process_chunk_async, chunks, max_concurrency or self.max_concurrency):
+            yield index, len(chunks), requirements
+
+    def _generate(self, prompt, temperature) -> Requirements:
+        """Run one structured generation, served from and stored to the LLM result cache."""
+        key = llm_cache.make_key(self.model_name, prompt, temperature)
+        cached = llm_cache.lookup(key)
+        if cached is not None:
+            return cached
+
+        metrics.PROMPT_CHARS.labels(model=self.model_name).observe(len(prompt))
+        with metrics.timed("llm_call", self.model_name):
             response = self.generator(
                 prompt,
                 Requirements,
-                temperature=0.5,
+                temperature=temperature,
+            )
+        metrics.RESPONSE_CHARS.labels(model=self.model_name).observe(len(response))
+        result = Requirements.model_validate_json(clean_llm_response(response))
+        llm_cache.store(key, result)
+        return result
+
+    def _hedge_delay(self):
+        """Seconds to wait before hedging, or None when hedging is off or latency is not yet known."""
+        if self.hedge_percentile <= 0 or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def _hedge_extractor(self):
+        """The extractor hedged calls go to. Building it loads a client and tokenizer,
+        so the first call resolves it on a worker thread; later calls reuse it."""
+        if self._hedge is None:
+            self._hedge = await asyncio.to_thread(get_extractor_for, self.hedge_model) if self.hedge_model else self
+        return self._hedge
+
+    def _count_hedge(self, hedged, hedge_won):
+        self.hedge_counts["calls"] += 1
+        self.hedge_counts["hedged"] += hedged
+        self.hedge_counts["hedge_wins"] += hedge_won
+        outcome = "hedge_won" if hedge_won else "hedge_lost" if hedged else "not_hedged"
+        metrics.HEDGES.labels(model=self.model_name, outcome=outcome).inc()
+
+    def stats(self):
+        counts = dict(self.hedge_counts)
+        counts["hedge_rate"] = counts["hedged"] / counts["calls"] if counts["calls"] else 0.0
+        counts.update({f"single_flight_{k}": v for k, v in self._flights.stats().items()})
+        return counts
+
+    async def _call_async(self, prompt, temperature, record_latency=True) -> Requirements:
+        """One uncached provider call.
+
+        With ``record_latency`` its latency feeds the hedge delay, also when it fails
+        or is cancelled (e.g. because the hedge won): the time it had run so far is a
+        lower bound, and leaving slow calls out would pull the percentile down. Hedge
+        calls are not recorded; they only start once the primary is already slow.
+        """
+        metrics.PROMPT_CHARS.labels(model=self.model_name).observe(len(prompt))
+        start = time.perf_counter()
+        try:
+            with metrics.timed("llm_call", self.model_name):
+                response = await self.async_generator(
+                    prompt,
+                    Requirements,
+                    temperature=temperature,
+                )
+            metrics.RESPONSE_CHARS.labels(model=self.model_name).observe(len(response))
+            return Requirements.model_validate_json(clean_llm_response(response))
+        finally:
+            if record_latency:
+                self.latency.record(time.perf_counter() - start)
+
+    async def _generate_async(self, prompt, temperature) -> Requirements:
+        key = llm_cache.make_key(self.model_name, prompt, temperature)
+        # The cache is SQLite; keep its I/O off the event loop.
+        cached = await asyncio.to_thread(llm_cache.lookup, key)
+        if cached is not None:
+            return cached
+
+        hedge_extractor = await self._hedge_extractor()
+        hedged = False
+
+        def hedge():
+            nonlocal hedged
+            hedged = True
+            return hedge_extractor._call_async(prompt, temperature, record_latency=False)
+
+        try:
+            result, _, hedge_won = await race_with_hedge(
+                lambda: self._call_async(prompt, temperature),
+                hedge,
+                self._hedge_delay(),
             )
-            # Clean up response
-            response = response.replace("\n", "")
-            response = response.replace("<|return|>", "")
-            response = response.replace("```json", "")
-            response = response.replace("```", "")
-            return Requirements.model_validate_json(response)
+        except Exception:
+            # Every attempt failed; the call still counts.
+            self._count_hedge(hedged, False)
+            raise
+        self._count_hedge(hedged, hedge_won)
+
+        # Cache under the model that actually produced the result.
+        winner = hedge_extractor if hedge_won else self
+        await asyncio.to_thread(llm_cache.store, llm_cache.make_key(winner.model_name, prompt, temperature), result)
+        return result
+
+    def process_chunk(self, chunk) -> Requirements:
+        """Process a single chunk using the template and external API."""
+        try:
+            return self._generate(self._chunk_prompt(chunk), CHUNK_TEMPERATURE)
+        except Exception as e:
+            metrics.LLM_FALLBACKS.labels(model=self.model_name, kind="chunk").inc()
+            print(f"Error during generation: {e}")
+            return Requirements()
+
+    async def process_chunk_async(self, chunk) -> Requirements:
+        try:
+            return await self._generate_async(self._chunk_prompt(chunk), CHUNK_TEMPERATURE)
         except Exception as e:
+            metrics.LLM_FALLBACKS.labels(model=self.model_name, kind="chunk").inc()
             print(f"Error during generation: {e}")
             return Requirements()
 
     def judge_requirements(self, input_text: str, requirements: Requirements) -> Requirements:
-        current_dir = Path(__file__).resolve().parent
-        template_path = current_dir / "prompt_judge_template.txt"
-        template = Template.from_file(str(template_path))
-        prompt = template(
-            input_text=input_text,
-            requirements_json=requirements.model_dump_json(),
-        )
+        try:
+            with metrics.timed("judge", self.model_name):
+                return self._generate(self._judge_prompt(input_text, requirements), JUDGE_TEMPERATURE)
+        except Exception as e:
+            metrics.LLM_FALLBACKS.labels(model=self.model_name, kind="judge").inc()
+            print(f"Error during judge generation: {e}")
+            return requirements
 
+    async def judge_requirements_async(self, input_text: str, requirements: Requirements) -> Requirements:
+        key = ("judge", input_text, requirements.model_dump_json(), llm_cache.bypassed())
+        return await self._flights.do(key, lambda: self._judge_requirements_async(input_text, requirements))
+
+    async def _judge_requirements_async(self, input_text: str, requirements: Requirements) -> Requirements:
         try:
-            response = self.generator(
-                prompt,
-                Requirements,
-                temperature=0.0,
-            )
-            response = response.replace("\n", "")
-            response = response.replace("<|return|>", "")
-            response = response.replace("```json", "")
-            response = response.replace("```", "")
-            return Requirements.model_validate_json(response)
+            with metrics.timed("judge", self.model_name):
+                return await self._generate_async(self._judge_prompt(input_text, requirements), JUDGE_TEMPERATURE)
         except Exception as e:
+            metrics.LLM_FALLBACKS.labels(model=self.model_name, kind="judge").inc()
             print(f"Error during judge generation: {e}")
             return requirements
 
@@ -118,11 +316,19 @@ def get_extractor_for(model_key):
     if model_key not in EXTERNAL_MODELS_CONFIG:
         raise ValueError(f"Unknown model_key: {model_key}")
 
-    if model_key not in _MODEL_INSTANCES:
-        config = EXTERNAL_MODELS_CONFIG[model_key]
-        _MODEL_INSTANCES[model_key] = ExternalLLMExtractor(
-            model_name=config["model_name"],
-            chunk_size=config["chunk_size"],
-        )
-
-    return _MODEL_INSTANCES[model_key]
+    extractor = _MODEL_INSTANCES.get(model_key)
+    if extractor is None:
+        # Reached from the warm-up thread and from requests; build each extractor once.
+        with _instances_lock:
+            extractor = _MODEL_INSTANCES.get(model_key)
+            if extractor is None:
+                config = EXTERNAL_MODELS_CONFIG[model_key]
+                extractor = _MODEL_INSTANCES[model_key] = ExternalLLMExtractor(
+                    model_name=config["model_name"],
+                    chunk_size=config["chunk_size"],
+                    max_concurrency=config.get("max_concurrency"),
+                    tokenizer=config.get("tokenizer"),
+                    section_size=config.get("section_size"),
+                    hedge_model=config.get("hedge_model"),
+                )
+    return extractor
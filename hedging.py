@@ -0,0 +1,59 @@
+import asyncio
+from collections import deque
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies, used to pick the hedge delay."""
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            return float(np.percentile(self._samples, p))
+
+
+async def race_with_hedge(primary, hedge, delay: Optional[float]):
+    """Await ``primary()``; if it is still running after ``delay`` seconds, also start ``hedge()``.
+
+    ``primary`` and ``hedge`` are zero-argument coroutine functions. The first call
+    to succeed wins and the other one is cancelled. If both fail, the last error
+    is raised. Returns ``(result, hedged, hedge_won)``.
+    """
+    first = asyncio.ensure_future(primary())
+    second = None
+    try:
+        if delay is None:
+            return await first, False, False
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result(), False, False
+
+        second = asyncio.ensure_future(hedge())
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), True, task is second
+                error = task.exception()
+        raise error
+    finally:
+        for task in (first, second):
+            if task is not None and not task.done():
+                task.cancel()
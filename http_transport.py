@@ -0,0 +1,104 @@
+import asyncio
+import os
+import threading
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_lock = threading.Lock()
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("LLM_HTTP2", "1") != "1":
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _client_kwargs():
+    """Pool settings shared by the sync and async clients, read from the environment."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            # Providers keep idle connections open for a while; reusing them skips TCP + TLS setup.
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS", "90")),
+        ),
+        "http2": _http2_enabled(),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Connection pool shared by every sync OpenAI client in the process."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from openai import DefaultHttpxClient
+
+                _client = DefaultHttpxClient(**_client_kwargs())
+    return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Connection pool shared by every AsyncOpenAI client in the process.
+
+    Its connections belong to the event loop that opened them, so it is meant
+    for the server's single loop.
+    """
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                from openai import DefaultAsyncHttpxClient
+
+                _async_client = DefaultAsyncHttpxClient(**_client_kwargs())
+    return _async_client
+
+
+async def prewarm(base_url: str, connections: int, timeout: float = 10.0) -> int:
+    """Open up to ``connections`` pooled connections to ``base_url`` ahead of the first request.
+
+    Any HTTP status counts as success: the point is the completed TCP/TLS handshake
+    left in the pool. Returns the number of successful requests. Under HTTP/2 the
+    pool multiplexes concurrent requests onto one connection per host, so only one
+    is opened.
+    """
+    client = get_async_http_client()
+    if _http2_enabled():
+        connections = min(connections, 1)
+
+    async def touch():
+        try:
+            await client.get(base_url, timeout=timeout)
+            return True
+        except httpx.HTTPError as e:
+            print(f"Connection pre-warm to {base_url} failed: {e}")
+            return False
+
+    results = await asyncio.gather(*(touch() for _ in range(connections)))
+    return sum(results)
+
+
+async def aclose() -> None:
+    """Close the shared clients (called on application shutdown).
+
+    Cached extractors hold OpenAI clients bound to the closed pools, so they are
+    dropped as well; the next get_extractor_for() builds them on fresh pools.
+    """
+    global _client, _async_client
+    # Imported here: external_model imports this module.
+    import external_model
+
+    external_model._MODEL_INSTANCES.clear()
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
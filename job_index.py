@@ -0,0 +1,293 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from api_schema import Requirements
+from utils import connect_sqlite
+
+REQUIREMENT_FIELDS = list(Requirements.model_fields)
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _centroid(field_embeddings: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+    """Normalized mean of every item vector; the coarse representation used for prefiltering."""
+    arrays = [e for e in field_embeddings.values() if len(e)]
+    if not arrays:
+        return None
+    return _normalize(np.concatenate(arrays).mean(axis=0))
+
+
+def weighted_maxsim(profile_embeddings: Dict[str, np.ndarray],
+                    job_embeddings: Dict[str, np.ndarray],
+                    weights: Dict[str, float]) -> float:
+    """compute_similarity's weighted MaxSim over pre-normalized per-field embeddings."""
+    score = 0.0
+    for field in REQUIREMENT_FIELDS:
+        user = profile_embeddings.get(field)
+        job = job_embeddings.get(field)
+        if user is None or job is None or not len(user) or not len(job):
+            continue
+        score += float((job @ user.T).max(axis=1).mean()) * weights.get(field, 0.0)
+    return score
+
+
+class JobIndex:
+    """Extracted job postings with per-field requirement embeddings, persisted in SQLite.
+
+    Ranking first scores every job by the dot product of its item centroid with the
+    profile centroid (one matrix-vector product), then rescores only the best
+    candidates with the exact weighted MaxSim.
+
+    Several processes can share one database: each write is logged in job_changes,
+    and every call first applies the jobs other processes changed since the last one.
+    ``namespace`` names the embedding backend the vectors come from. Stored jobs
+    embedded under another namespace are not ranked until they are re-encoded: the
+    caller encodes the jobs from stale() (outside the index lock) and passes the
+    vectors to reencode().
+    """
+
+    def __init__(self, path: Optional[str] = None, namespace: Optional[str] = None):
+        self.path = path
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Last job_changes version applied to the in-memory state.
+        self._version = 0
+        self._requirements: Dict[str, Requirements] = {}
+        self._embeddings: Dict[str, Dict[str, np.ndarray]] = {}
+        # Jobs whose stored vectors come from another namespace, waiting for reencode().
+        self._stale: Dict[str, Requirements] = {}
+        # Dense centroid matrix; row i belongs to self._ids[i]. Grows by doubling.
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    " job_id TEXT PRIMARY KEY, requirements TEXT NOT NULL, namespace TEXT)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS job_items ("
+                    " job_id TEXT NOT NULL, field TEXT NOT NULL, position INTEGER NOT NULL,"
+                    " vector BLOB NOT NULL, PRIMARY KEY (job_id, field, position))"
+                )
+                # One row per job id, renumbered on every write to it.
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS job_changes ("
+                    " version INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL UNIQUE)"
+                )
+                if "namespace" not in [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]:
+                    # Written before namespaces and the change log: re-encode every job once.
+                    conn.execute("ALTER TABLE jobs ADD COLUMN namespace TEXT")
+                    conn.execute("INSERT OR IGNORE INTO job_changes (job_id) SELECT job_id FROM jobs")
+            with self._lock:
+                self._sync()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+        return conn
+
+    def _rows(self, conn: sqlite3.Connection,
+              job_ids: List[str]) -> Iterator[Tuple[str, Requirements, Dict[str, np.ndarray], Optional[str]]]:
+        """Stored ``(job id, requirements, embeddings, namespace)`` of the given jobs that still exist."""
+        placeholders = ", ".join("?" * len(job_ids))
+        vectors: Dict[str, Dict[str, list]] = {}
+        for job_id, field, blob in conn.execute(
+                f"SELECT job_id, field, vector FROM job_items WHERE job_id IN ({placeholders})"
+                " ORDER BY job_id, field, position", job_ids):
+            vectors.setdefault(job_id, {}).setdefault(field, []).append(np.frombuffer(blob, dtype=np.float32))
+
+        for job_id, requirements_json, namespace in conn.execute(
+                f"SELECT job_id, requirements, namespace FROM jobs WHERE job_id IN ({placeholders})", job_ids):
+            embeddings = {field: np.stack(rows) for field, rows in vectors.get(job_id, {}).items()}
+            yield job_id, Requirements.model_validate_json(requirements_json), embeddings, namespace
+
+    def _sync(self) -> None:
+        """Apply the jobs added or removed (by any process) since the last sync. Caller holds the lock."""
+        if not self.path:
+            return
+        conn = self._connection()
+        changes = conn.execute("SELECT version, job_id FROM job_changes WHERE version > ? ORDER BY version",
+                               (self._version,)).fetchall()
+        if not changes:
+            return
+        self._version = changes[-1][0]
+
+        job_ids = [job_id for _, job_id in changes]
+        for job_id in job_ids:
+            self._drop(job_id)
+        for start in range(0, len(job_ids), 500):
+            for job_id, requirements, embeddings, namespace in self._rows(conn, job_ids[start:start + 500]):
+                if self.namespace is not None and namespace != self.namespace:
+                    # Vectors of another backend do not compare with this one's; they are encoded again.
+                    self._requirements[job_id] = requirements
+                    self._stale[job_id] = requirements
+                else:
+                    self._put(job_id, requirements, embeddings)
+
+    def _write(self, job_id: str, requirements: Requirements) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+            conn.execute("INSERT OR REPLACE INTO jobs (job_id, requirements, namespace) VALUES (?, ?, ?)",
+                         (job_id, requirements.model_dump_json(), self.namespace))
+            conn.executemany(
+                "INSERT INTO job_items (job_id, field, position, vector) VALUES (?, ?, ?, ?)",
+                [(job_id, field, i, vector.tobytes())
+                 for field, vectors in self._embeddings[job_id].items() for i, vector in enumerate(vectors)],
+            )
+            self._log_change(conn, job_id)
+
+    def _log_change(self, conn: sqlite3.Connection, job_id: str) -> None:
+        """Log a write to ``job_id``. Caller holds the lock, inside the write's transaction.
+
+        If no other process wrote since the last sync, this write is the only newer
+        change, so the in-memory state is already current and the version can advance.
+        """
+        version = conn.execute("INSERT OR REPLACE INTO job_changes (job_id) VALUES (?)", (job_id,)).lastrowid
+        if version == self._version + 1:
+            self._version = version
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._requirements)
+
+    def __contains__(self, job_id: str) -> bool:
+        with self._lock:
+            self._sync()
+            return job_id in self._requirements
+
+    def get(self, job_id: str) -> Optional[Requirements]:
+        with self._lock:
+            self._sync()
+            return self._requirements.get(job_id)
+
+    def stale(self) -> List[Tuple[str, Requirements]]:
+        """Jobs stored with vectors of another namespace; encode them and call reencode()."""
+        with self._lock:
+            self._sync()
+            return list(self._stale.items())
+
+    def reencode(self, job_id: str, requirements: Requirements, embeddings: Dict[str, np.ndarray]) -> bool:
+        """Store the vectors of a stale job, unless it was replaced or removed meanwhile."""
+        with self._lock:
+            self._sync()
+            if self._stale.get(job_id) != requirements:
+                return False
+            self._put(job_id, requirements, embeddings)
+            self._write(job_id, requirements)
+            return True
+
+    def _put(self, job_id: str, requirements: Requirements, embeddings: Dict[str, np.ndarray]) -> None:
+        self._drop(job_id)
+        embeddings = {f: _normalize(np.asarray(e, dtype=np.float32)) for f, e in embeddings.items() if len(e)}
+        self._requirements[job_id] = requirements
+        self._embeddings[job_id] = embeddings
+
+        centroid = _centroid(embeddings)
+        if centroid is None:
+            return
+        if self._centroids is None:
+            self._centroids = np.empty((16, centroid.shape[0]), dtype=np.float32)
+        elif len(self._ids) == len(self._centroids):
+            grown = np.empty((2 * len(self._centroids), self._centroids.shape[1]), dtype=np.float32)
+            grown[:len(self._ids)] = self._centroids[:len(self._ids)]
+            self._centroids = grown
+        self._centroids[len(self._ids)] = centroid
+        self._row_of[job_id] = len(self._ids)
+        self._ids.append(job_id)
+
+    def _drop(self, job_id: str) -> None:
+        self._requirements.pop(job_id, None)
+        self._embeddings.pop(job_id, None)
+        self._stale.pop(job_id, None)
+        row = self._row_of.pop(job_id, None)
+        if row is None:
+            return
+        # Move the last row into the hole to keep the matrix dense.
+        last_id = self._ids.pop()
+        if last_id != job_id:
+            self._centroids[row] = self._centroids[len(self._ids)]
+            self._ids[row] = last_id
+            self._row_of[last_id] = row
+
+    def add(self, job_id: str, requirements: Requirements, embeddings: Dict[str, np.ndarray]) -> None:
+        """Insert or replace a job; ``embeddings`` maps each field to its (items, dim) vectors."""
+        with self._lock:
+            self._sync()
+            self._put(job_id, requirements, embeddings)
+            if self.path:
+                self._write(job_id, requirements)
+
+    def remove(self, job_id: str) -> bool:
+        with self._lock:
+            self._sync()
+            existed = job_id in self._requirements
+            self._drop(job_id)
+            if existed and self.path:
+                conn = self._connection()
+                with conn:
+                    conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                    conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+                    self._log_change(conn, job_id)
+        return existed
+
+    def search(self,
+               profile_embeddings: Dict[str, np.ndarray],
+               k: int,
+               weights: Dict[str, float],
+               candidates: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Top-``k`` (job id, score) pairs by weighted MaxSim against the profile."""
+        profile_embeddings = {f: _normalize(np.asarray(e, dtype=np.float32))
+                              for f, e in profile_embeddings.items() if len(e)}
+        profile_centroid = _centroid(profile_embeddings)
+        if profile_centroid is None:
+            return []
+
+        with self._lock:
+            self._sync()
+            count = len(self._ids)
+            if not count:
+                return []
+            coarse = self._centroids[:count] @ profile_centroid
+            n_candidates = min(count, candidates or max(10 * k, 100))
+            if n_candidates < count:
+                shortlist = np.argpartition(-coarse, n_candidates - 1)[:n_candidates]
+            else:
+                shortlist = np.arange(count)
+            job_embeddings = [(self._ids[i], self._embeddings[self._ids[i]]) for i in shortlist]
+
+        scored = [(job_id, weighted_maxsim(profile_embeddings, embeddings, weights))
+                  for job_id, embeddings in job_embeddings]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:k]
+
+
+def get_job_index() -> JobIndex:
+    """Process-wide index; JOB_INDEX_PATH persists it (unset keeps it in memory).
+
+    Worker processes that share a JOB_INDEX_PATH see each other's jobs.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            import similarity_search
+
+            _index = JobIndex(os.getenv("JOB_INDEX_PATH") or None, namespace=similarity_search._cache_namespace())
+        return _index
@@ -0,0 +1,148 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from api_schema import Requirements
+from utils import connect_sqlite
+
+# Set per request; when True lookups are skipped but fresh results are still stored.
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class LLMResultCache:
+    """Content-addressed SQLite store of LLM outputs with TTL and size-bounded eviction."""
+
+    # Run eviction every this many writes rather than on each one.
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 100000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_results ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_results_created_at ON llm_results (created_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value FROM llm_results WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_results (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now + self.ttl_seconds),
+            )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop expired rows, then the oldest rows beyond ``max_entries``."""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM llm_results WHERE expires_at <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM llm_results WHERE key IN ("
+                " SELECT key FROM llm_results ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+def get_llm_cache() -> Optional[LLMResultCache]:
+    """Shared cache configured by LLM_CACHE_PATH; returns None (disabled) when unset."""
+    global _cache
+    path = os.getenv("LLM_CACHE_PATH")
+    if not path:
+        return None
+    cache = _cache
+    if cache is None or cache.path != path:
+        # Lookups now run on worker threads; concurrent first callers must share one cache.
+        with _cache_lock:
+            if _cache is None or _cache.path != path:
+                _cache = LLMResultCache(
+                    path,
+                    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000")),
+                )
+            cache = _cache
+    return cache
+
+
+def make_key(model_name: str, prompt: str, temperature: float) -> str:
+    """Hash every input that determines the LLM output.
+
+    The rendered prompt already covers the template text and the chunk/judge inputs.
+    """
+    payload = json.dumps([model_name, prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def bypass(enabled: bool = True):
+    """Skip cache lookups for LLM calls made inside this block (results are still stored)."""
+    token = _bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def bypassed() -> bool:
+    """Whether the current request asked to skip cached results."""
+    return _bypass.get()
+
+
+def lookup(key: str) -> Optional[Requirements]:
+    cache = get_llm_cache()
+    if cache is None or bypassed():
+        return None
+    value = cache.get(key)
+    return Requirements.model_validate_json(value) if value is not None else None
+
+
+def store(key: str, requirements: Requirements) -> None:
+    cache = get_llm_cache()
+    if cache is not None:
+        cache.set(key, requirements.model_dump_json())
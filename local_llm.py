@@ -0,0 +1,85 @@
+import copy
+from typing import List, Optional
+
+
+class PrefixCachedGenerator:
+    """Batched greedy generation with a causal LM from Hugging Face transformers, on CPU.
+
+    Every extraction prompt starts with the same instructions from prompt_template.txt.
+    Their key/value cache is computed once in the constructor. Each batch then
+    copies it and only runs the per-chunk suffixes through the model. Suffixes are
+    left-padded *between* the cached prefix and the text; the attention mask hides
+    the padding, and generate() derives position ids from the mask.
+    """
+
+    def __init__(self, model_id: str, prompt_prefix: str = "", device_kwargs: Optional[dict] = None,
+                 max_new_tokens: int = 1024):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self._torch = torch
+        self.max_new_tokens = max_new_tokens
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(model_id, **(device_kwargs or {})).eval()
+
+        # Split the chat-formatted prompt into the shared head and the tail that follows the chunk.
+        sentinel = "\x00CHUNK\x00"
+        head, self._tail = self._format(prompt_prefix + sentinel).split(sentinel)
+        self.prompt_prefix = prompt_prefix
+        self._prefix_ids = self._encode(head)
+        self._prefix_cache = None
+        if self._prefix_ids:
+            with torch.no_grad():
+                self._prefix_cache = self.model(torch.tensor([self._prefix_ids]), use_cache=True).past_key_values
+
+    def _format(self, content: str) -> str:
+        if not self.tokenizer.chat_template:
+            return content
+        return self.tokenizer.apply_chat_template(
+            [{"role": "user", "content": content}],
+            tokenize=False,
+            add_generation_prompt=True,
+            enable_thinking=False,
+        )
+
+    def _encode(self, text: str) -> List[int]:
+        return self.tokenizer(text, add_special_tokens=False).input_ids
+
+    def generate(self, prompts: List[str]) -> List[str]:
+        """Greedy completions for ``prompts`` (raw user messages), generated as one batch."""
+        if not prompts:
+            return []
+        torch = self._torch
+        cached = self._prefix_cache is not None and all(p.startswith(self.prompt_prefix) for p in prompts)
+        if cached:
+            sequences = [self._encode(p[len(self.prompt_prefix):] + self._tail) for p in prompts]
+        else:
+            sequences = [self._encode(self._format(p)) for p in prompts]
+
+        width = max(len(s) for s in sequences)
+        pad = self.tokenizer.pad_token_id
+        input_ids = torch.tensor([[pad] * (width - len(s)) + s for s in sequences])
+        attention_mask = torch.tensor([[0] * (width - len(s)) + [1] * len(s) for s in sequences])
+
+        kwargs = {}
+        if cached:
+            batch_size = len(prompts)
+            prefix = torch.tensor([self._prefix_ids]).expand(batch_size, -1)
+            input_ids = torch.cat([prefix, input_ids], dim=1)
+            attention_mask = torch.cat([torch.ones_like(prefix), attention_mask], dim=1)
+            cache = copy.deepcopy(self._prefix_cache)
+            cache.batch_repeat_interleave(batch_size)
+            kwargs["past_key_values"] = cache
+
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                max_new_tokens=self.max_new_tokens,
+                do_sample=False,
+                pad_token_id=pad,
+                **kwargs,
+            )
+        return self.tokenizer.batch_decode(output[:, input_ids.shape[1]:], skip_special_tokens=True)
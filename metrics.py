@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Pipeline stages, each labelled with the model id it ran on:
+#   extraction  - full chunk extraction of one posting by one extractor
+#   chunking    - splitting the posting into chunks
+#   llm_call    - one provider round-trip (chunk or judge prompt)
+#   judge       - the judge step of a pipeline
+#   embedding   - one encode() call of the embedding model
+#   similarity  - embedding + scoring of one request
+STAGE_SECONDS = Histogram(
+    "jobmatcher_stage_seconds",
+    "Latency of each extraction and scoring stage",
+    ["stage", "model"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+CHUNKS_PER_TEXT = Histogram(
+    "jobmatcher_chunks_per_text",
+    "Chunks a posting was split into",
+    ["model"],
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 32, 64),
+)
+LLM_FALLBACKS = Counter(
+    "jobmatcher_llm_fallbacks_total",
+    "LLM calls that failed (provider or parse error) and fell back to a default result",
+    ["model", "kind"],
+)
+PROMPT_CHARS = Histogram(
+    "jobmatcher_llm_prompt_chars",
+    "Characters sent to the provider per call",
+    ["model"],
+    buckets=(1e3, 5e3, 1e4, 2.5e4, 5e4, 1e5, 2.5e5),
+)
+RESPONSE_CHARS = Histogram(
+    "jobmatcher_llm_response_chars",
+    "Characters received from the provider per call",
+    ["model"],
+    buckets=(100, 250, 500, 1e3, 2.5e3, 5e3, 1e4, 5e4),
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "jobmatcher_embedding_batch_size",
+    "Strings per embedding model call",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+EMBEDDING_CACHE = Counter(
+    "jobmatcher_embedding_cache_total",
+    "Embedding cache lookups by tier (lru, sqlite) and result (hit, miss)",
+    ["tier", "result"],
+)
+
+
+def _embedding_queue_depth():
+    # Imported here: similarity_search imports this module.
+    import similarity_search
+
+    batcher = similarity_search.get_embedding_batcher()
+    return batcher.stats()["queue_depth"] if batcher is not None else 0
+
+
+EMBEDDING_QUEUE_DEPTH = Gauge(
+    "jobmatcher_embedding_queue_depth",
+    "Encode requests waiting for the embedding micro-batcher (0 when batching is off)",
+)
+EMBEDDING_QUEUE_DEPTH.set_function(_embedding_queue_depth)
+
+HEDGES = Counter(
+    "jobmatcher_llm_hedges_total",
+    "LLM calls by hedging outcome (not_hedged, hedge_lost, hedge_won)",
+    ["model", "outcome"],
+)
+COALESCED = Counter(
+    "jobmatcher_single_flight_coalesced_total",
+    "Calls that joined an identical in-flight extraction instead of starting one",
+    ["model"],
+)
+
+
+@contextmanager
+def timed(stage: str, model: str):
+    """Observe the duration of the block in STAGE_SECONDS, including when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=stage, model=model).observe(time.perf_counter() - start)
+
+
+def process_memory(pid="self"):
+    """RSS, PSS and USS (private pages) of a process in bytes, from /proc/<pid>/smaps_rollup.
+
+    USS is the memory a worker would free if it exited; pages shared copy-on-write
+    with the preloading parent count towards RSS and PSS only. Returns an empty
+    dict where smaps_rollup is unavailable (non-Linux, or the process is gone).
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+PROCESS_MEMORY = Gauge(
+    "jobmatcher_process_memory_bytes",
+    "Memory of this worker process by kind (rss, pss, uss)",
+    ["kind"],
+)
+for _kind in ("rss", "pss", "uss"):
+    PROCESS_MEMORY.labels(kind=_kind).set_function(lambda kind=_kind: process_memory().get(kind, 0))
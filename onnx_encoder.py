@@ -0,0 +1,82 @@
+import os
+import platform
+from typing import List, Optional
+
+import numpy as np
+
+DEFAULT_REPO_ID = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def _default_model_file(quantized: bool) -> str:
+    """Pick one of the ONNX exports published next to the model on the HF hub."""
+    if not quantized:
+        return "onnx/model.onnx"
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+
+class OnnxSentenceEncoder:
+    """Sentence embeddings from an exported ONNX transformer, without importing torch.
+
+    Reproduces the all-MiniLM-L6-v2 SentenceTransformer pipeline (transformer ->
+    attention-masked mean pooling -> L2 normalization) with onnxruntime + tokenizers.
+    """
+
+    def __init__(self, model_path: str, tokenizer_path: str, max_seq_length: int = 256,
+                 batch_size: int = 32, intra_op_num_threads: Optional[int] = None):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_num_threads:
+            options.intra_op_num_threads = intra_op_num_threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_pretrained(cls, repo_id: str = DEFAULT_REPO_ID, quantized: bool = False,
+                        model_file: Optional[str] = None, local_dir: Optional[str] = None, **kwargs):
+        """Load from ``local_dir`` if given (offline/baked images), else from the HF hub cache."""
+        model_file = model_file or _default_model_file(quantized)
+        if local_dir:
+            return cls(os.path.join(local_dir, model_file), os.path.join(local_dir, "tokenizer.json"), **kwargs)
+
+        from huggingface_hub import hf_hub_download
+
+        return cls(hf_hub_download(repo_id, model_file), hf_hub_download(repo_id, "tokenizer.json"), **kwargs)
+
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(sentences)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        token_embeddings = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, sentences: List[str], batch_size: Optional[int] = None, **_) -> np.ndarray:
+        """Encode ``sentences`` into a (len, dim) float32 array, in input order."""
+        if not sentences:
+            return np.empty((0, 0), dtype=np.float32)
+        batch_size = batch_size or self.batch_size
+
+        # Length-sorted batches keep padding (and wasted compute) low, as SentenceTransformer does.
+        order = sorted(range(len(sentences)), key=lambda i: -len(sentences[i]))
+        out = [None] * len(sentences)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            for i, vector in zip(idx, self._encode_batch([sentences[i] for i in idx])):
+                out[i] = vector
+        return np.stack(out).astype(np.float32)
@@ -0,0 +1,241 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from api_schema import UserProfile
+from utils import connect_sqlite
+
+PROFILE_FIELDS = list(UserProfile.model_fields)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class ProfileStore:
+    """User profiles with per-field item embeddings, persisted in SQLite.
+
+    Updating a profile only needs vectors for item texts it did not contain before;
+    everything else is reused from the stored profile. Like JobIndex, processes that
+    share the database see each other's writes, and profiles embedded under another
+    ``namespace`` have no embeddings until they are passed through stale() and reencode().
+    """
+
+    def __init__(self, path: Optional[str] = None, namespace: Optional[str] = None):
+        self.path = path
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._version = 0
+        self._profiles: Dict[str, UserProfile] = {}
+        self._embeddings: Dict[str, Dict[str, np.ndarray]] = {}
+        self._stale: Dict[str, UserProfile] = {}
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS profiles ("
+                    " profile_id TEXT PRIMARY KEY, profile TEXT NOT NULL, namespace TEXT)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS profile_items ("
+                    " profile_id TEXT NOT NULL, field TEXT NOT NULL, position INTEGER NOT NULL,"
+                    " vector BLOB NOT NULL, PRIMARY KEY (profile_id, field, position))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS profile_changes ("
+                    " version INTEGER PRIMARY KEY AUTOINCREMENT, profile_id TEXT NOT NULL UNIQUE)"
+                )
+                if "namespace" not in [row[1] for row in conn.execute("PRAGMA table_info(profiles)")]:
+                    conn.execute("ALTER TABLE profiles ADD COLUMN namespace TEXT")
+                    conn.execute("INSERT OR IGNORE INTO profile_changes (profile_id) SELECT profile_id FROM profiles")
+            with self._lock:
+                self._sync()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+        return conn
+
+    def _rows(self, conn: sqlite3.Connection,
+              profile_ids: List[str]) -> Iterator[Tuple[str, UserProfile, Dict[str, np.ndarray], Optional[str]]]:
+        """Stored ``(profile id, profile, embeddings, namespace)`` of the given profiles that still exist."""
+        placeholders = ", ".join("?" * len(profile_ids))
+        vectors: Dict[str, Dict[str, list]] = {}
+        for profile_id, field, blob in conn.execute(
+                f"SELECT profile_id, field, vector FROM profile_items WHERE profile_id IN ({placeholders})"
+                " ORDER BY profile_id, field, position", profile_ids):
+            vectors.setdefault(profile_id, {}).setdefault(field, []).append(np.frombuffer(blob, dtype=np.float32))
+
+        for profile_id, profile_json, namespace in conn.execute(
+                f"SELECT profile_id, profile, namespace FROM profiles WHERE profile_id IN ({placeholders})",
+                profile_ids):
+            embeddings = {field: np.stack(rows) for field, rows in vectors.get(profile_id, {}).items()}
+            yield profile_id, UserProfile.model_validate_json(profile_json), embeddings, namespace
+
+    def _sync(self) -> None:
+        """Apply the profiles stored or removed (by any process) since the last sync. Caller holds the lock."""
+        if not self.path:
+            return
+        conn = self._connection()
+        changes = conn.execute("SELECT version, profile_id FROM profile_changes WHERE version > ? ORDER BY version",
+                               (self._version,)).fetchall()
+        if not changes:
+            return
+        self._version = changes[-1][0]
+
+        profile_ids = [profile_id for _, profile_id in changes]
+        for profile_id in profile_ids:
+            self._profiles.pop(profile_id, None)
+            self._embeddings.pop(profile_id, None)
+            self._stale.pop(profile_id, None)
+        for start in range(0, len(profile_ids), 500):
+            for profile_id, profile, embeddings, namespace in self._rows(conn, profile_ids[start:start + 500]):
+                self._profiles[profile_id] = profile
+                if self.namespace is not None and namespace != self.namespace:
+                    self._stale[profile_id] = profile
+                else:
+                    self._embeddings[profile_id] = embeddings
+
+    def _write(self, profile_id: str, profile: UserProfile) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM profile_items WHERE profile_id = ?", (profile_id,))
+            conn.execute("INSERT OR REPLACE INTO profiles (profile_id, profile, namespace) VALUES (?, ?, ?)",
+                         (profile_id, profile.model_dump_json(), self.namespace))
+            conn.executemany(
+                "INSERT INTO profile_items (profile_id, field, position, vector) VALUES (?, ?, ?, ?)",
+                [(profile_id, field, i, vector.tobytes())
+                 for field, vectors in self._embeddings[profile_id].items() for i, vector in enumerate(vectors)],
+            )
+            self._log_change(conn, profile_id)
+
+    def _log_change(self, conn: sqlite3.Connection, profile_id: str) -> None:
+        """Log a write to ``profile_id``; like JobIndex, own writes advance the version when nothing came between."""
+        version = conn.execute("INSERT OR REPLACE INTO profile_changes (profile_id) VALUES (?)",
+                               (profile_id,)).lastrowid
+        if version == self._version + 1:
+            self._version = version
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._profiles)
+
+    def __contains__(self, profile_id: str) -> bool:
+        with self._lock:
+            self._sync()
+            return profile_id in self._profiles
+
+    def get(self, profile_id: str) -> Optional[UserProfile]:
+        with self._lock:
+            self._sync()
+            return self._profiles.get(profile_id)
+
+    def embeddings(self, profile_id: str) -> Optional[Dict[str, np.ndarray]]:
+        """Per-field (items, dim) normalized vectors of a stored profile."""
+        with self._lock:
+            self._sync()
+            return self._embeddings.get(profile_id)
+
+    def get_with_embeddings(self, profile_id: str) -> Tuple[Optional[UserProfile], Optional[Dict[str, np.ndarray]]]:
+        """``(profile, embeddings)`` read together, so a concurrent put() cannot land between them."""
+        with self._lock:
+            self._sync()
+            return self._profiles.get(profile_id), self._embeddings.get(profile_id)
+
+    def stale(self) -> List[Tuple[str, UserProfile]]:
+        """Profiles stored with vectors of another namespace; encode them and call reencode()."""
+        with self._lock:
+            self._sync()
+            return list(self._stale.items())
+
+    def reencode(self, profile_id: str, profile: UserProfile, embeddings: Dict[str, np.ndarray]) -> bool:
+        """Store the vectors of a stale profile, unless it was replaced or removed meanwhile."""
+        with self._lock:
+            self._sync()
+            if self._stale.get(profile_id) != profile:
+                return False
+            del self._stale[profile_id]
+            self._embeddings[profile_id] = {field: _normalize(np.asarray(e, dtype=np.float32))
+                                            for field, e in embeddings.items() if len(e)}
+            self._write(profile_id, profile)
+            return True
+
+    def _known_vectors(self, profile_id: str) -> Dict[str, np.ndarray]:
+        profile = self._profiles.get(profile_id)
+        embeddings = self._embeddings.get(profile_id)
+        if profile is None or embeddings is None:
+            return {}
+        return {text: embeddings[field][i]
+                for field in PROFILE_FIELDS for i, text in enumerate(getattr(profile, field))}
+
+    def put(self, profile_id: str, profile: UserProfile, vectors: Mapping[str, np.ndarray]) -> List[str]:
+        """Create or replace a profile.
+
+        ``vectors`` maps item texts to their embeddings; only texts the stored profile
+        does not already have are needed. If some are missing, nothing is stored and
+        those texts are returned; encode them and call put() again.
+        """
+        with self._lock:
+            self._sync()
+            known = self._known_vectors(profile_id)
+            missing = list(dict.fromkeys(
+                text for field in PROFILE_FIELDS for text in getattr(profile, field)
+                if text not in known and text not in vectors
+            ))
+            if missing:
+                return missing
+
+            def vector(text):
+                return known[text] if text in known else vectors[text]
+
+            embeddings = {
+                field: _normalize(np.stack([np.asarray(vector(t), dtype=np.float32) for t in items]))
+                for field in PROFILE_FIELDS
+                if (items := getattr(profile, field))
+            }
+            self._profiles[profile_id] = profile
+            self._embeddings[profile_id] = embeddings
+            self._stale.pop(profile_id, None)
+            if self.path:
+                self._write(profile_id, profile)
+        return []
+
+    def remove(self, profile_id: str) -> bool:
+        with self._lock:
+            self._sync()
+            existed = self._profiles.pop(profile_id, None) is not None
+            self._embeddings.pop(profile_id, None)
+            self._stale.pop(profile_id, None)
+            if existed and self.path:
+                conn = self._connection()
+                with conn:
+                    conn.execute("DELETE FROM profile_items WHERE profile_id = ?", (profile_id,))
+                    conn.execute("DELETE FROM profiles WHERE profile_id = ?", (profile_id,))
+                    self._log_change(conn, profile_id)
+        return existed
+
+
+def get_profile_store() -> ProfileStore:
+    """Process-wide store; PROFILE_STORE_PATH persists it (unset keeps it in memory).
+
+    Worker processes that share a PROFILE_STORE_PATH see each other's profiles.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            import similarity_search
+
+            _store = ProfileStore(os.getenv("PROFILE_STORE_PATH") or None,
+                                  namespace=similarity_search._cache_namespace())
+        return _store
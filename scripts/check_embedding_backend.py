@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from api_schema import Requirements, UserProfile  # noqa: E402
+from similarity_search import load_model, max_score_drift  # noqa: E402
+
+# Backend to validate against the torch reference: "onnx" or "onnx-int8".
+BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx-int8")
+# Maximum accepted absolute difference in the final similarity score.
+TOLERANCE = float(os.getenv("EMBEDDING_PARITY_TOLERANCE", "0.02"))
+
+USER_PROFILE = UserProfile(
+    skills=[
+        "Machine Learning",
+        "Domain-Driven Design (DDD)",
+        "Data Science",
+        "Spring Boot",
+        "Java",
+        "Python",
+        "Hibernate",
+        "PostgreSQL",
+        "R (Programming Language)",
+        "Project Management",
+    ],
+    experiences=["4 Years of Software development"],
+    qualifications=["Domain Driven Design", "Bsc. Wirtschaftsinformatik"],
+)
+
+REQUIREMENTS = [
+    Requirements(
+        skills=["Python programming", "Docker", "Kubernetes", "REST APIs"],
+        experiences=["3+ years in backend development"],
+        qualifications=["Bachelor's in Computer Science"],
+    ),
+    Requirements(
+        skills=["Java", "Spring", "SQL databases"],
+        experiences=["Experience with agile methodologies", "5+ years in software development"],
+        qualifications=["Master's degree in Information Systems"],
+    ),
+    Requirements(
+        skills=["Statistical modelling", "R", "Tableau"],
+        experiences=["2 years as a data analyst"],
+        qualifications=["PMP certification"],
+    ),
+]
+
+print(f"Loading torch reference and {BACKEND} backend...")
+reference = load_model("torch")
+candidate = load_model(BACKEND)
+
+drift = max_score_drift([(USER_PROFILE, r) for r in REQUIREMENTS], candidate, reference)
+print(f"Max similarity score drift: {drift:.5f} (tolerance {TOLERANCE})")
+if drift > TOLERANCE:
+    print("FAIL: backend is outside tolerance of the torch reference")
+    raise SystemExit(1)
+print("OK")
@@ -0,0 +1,45 @@
+"""Show which modules dominate the import time of the API.
+
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter and lists the
+slowest imports by cumulative time (the module plus everything it pulled in):
+
+    python scripts/import_profile.py --top 15
+    python scripts/import_profile.py --module similarity_search
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def profile_imports(module):
+    """Return ``[(name, self_us, cumulative_us)]`` for every module imported by ``import module``."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rows = profile_imports(args.module)
+    total = next((cumulative for name, _, cumulative in rows if name == args.module), 0)
+    print(f"import {args.module}: {total / 1e3:.0f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1e3:14.1f} {self_us / 1e3:9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
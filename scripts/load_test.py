@@ -0,0 +1,261 @@
+"""End-to-end load test against a local fake OpenAI-compatible provider.
+
+Starts a stand-in for the provider's /v1/chat/completions endpoint. Its latency
+is log-normal, it injects errors at a configurable rate, and it answers with canned
+Requirements JSON. Every external model is pointed at it through
+EXTERNAL_LLM_API_BASE_URL. The API is then served with uvicorn and driven with
+/extract (and, optionally, ensemble pipeline) requests at a fixed concurrency.
+The provider, the API and the driver each run on their own thread and event loop.
+The run reports throughput, latency percentiles and the event-loop lag of the
+API's loop.
+
+    python scripts/load_test.py --requests 500 --concurrency 50 --latency-ms 800 --error-rate 0.02
+
+--embedding-model=hash swaps in a deterministic hashing encoder so the run
+works offline and measures the service rather than the embedding model.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+INPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dummy_input.md")
+
+CANNED_REQUIREMENTS = [
+    {"skills": ["Python", "Docker", "Kubernetes"], "experiences": ["3+ years in backend development"],
+     "qualifications": ["Bachelor's in Computer Science"]},
+    {"skills": ["Java", "Spring Boot", "SQL"], "experiences": ["5+ years in software development"],
+     "qualifications": ["Master's degree in Information Systems"]},
+    {"skills": ["R", "Tableau", "Statistics"], "experiences": ["2 years as a data analyst"],
+     "qualifications": []},
+]
+
+USER_PROFILE = {
+    "skills": ["Machine Learning", "Spring Boot", "Java", "Python", "PostgreSQL"],
+    "experiences": ["4 Years of Software development"],
+    "qualifications": ["Bsc. Wirtschaftsinformatik"],
+}
+
+
+def make_fake_provider(latency_ms, latency_sigma, error_rate, seed=0):
+    """FastAPI app mimicking the chat completions endpoint; returns (app, stats)."""
+    app = FastAPI()
+    rng = random.Random(seed)
+    stats = {"calls": 0, "errors": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["calls"] += 1
+        # Log-normal latency with the given median; sigma controls the tail.
+        await asyncio.sleep(latency_ms / 1000 * rng.lognormvariate(0, latency_sigma))
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "injected failure", "type": "server_error"}}, status_code=500)
+
+        return {
+            "id": f"chatcmpl-fake-{stats['calls']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(rng.choice(CANNED_REQUIREMENTS))},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    return app, stats
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def monitor_loop_lag(samples, interval=0.01):
+    """Record how late a fixed-interval sleep wakes up: time the loop could not schedule anyone."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+class _LagMonitoredServer(uvicorn.Server):
+    """uvicorn server that samples the lag of the event loop it serves on into ``lag_samples``."""
+
+    def __init__(self, config, lag_samples):
+        super().__init__(config)
+        self.lag_samples = lag_samples
+
+    async def serve(self, sockets=None):
+        monitor = asyncio.create_task(monitor_loop_lag(self.lag_samples))
+        try:
+            await super().serve(sockets)
+        finally:
+            monitor.cancel()
+
+
+def serve_in_thread(app, port, lag_samples=None):
+    """Run ``app`` with uvicorn on its own thread and event loop, so neither the other
+    servers nor the driver load it. With ``lag_samples``, that loop's lag is recorded there.
+    """
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config) if lag_samples is None else _LagMonitoredServer(config, lag_samples)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread
+
+
+def percentiles(values, ps=(50, 90, 99)):
+    if not values:
+        return {f"p{p}": None for p in ps} | {"max": None}
+    arr = np.asarray(values)
+    return {f"p{p}": float(np.percentile(arr, p)) for p in ps} | {"max": float(arr.max())}
+
+
+def build_payload(i, text, args, rng):
+    if not args.same_text:
+        # A unique suffix keeps requests out of single-flight coalescing and the LLM cache.
+        text = f"{text}\n\n<!-- load-test request {i} -->"
+    payload = {"modelId": args.model_id, "inputText": text, "userProfile": USER_PROFILE}
+    if rng.random() < args.pipeline_ratio:
+        payload["extractionPipeline"] = {
+            "extractorModelIds": ["gpt-oss-120b", "qwen3-next-80b-thinking"],
+            "judgeModelId": "gpt-oss-120b",
+        }
+    return payload
+
+
+async def drive(base_url, args, text):
+    """Send ``args.requests`` requests with at most ``args.concurrency`` in flight."""
+    rng = random.Random(args.seed)
+    results = []
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        async def worker():
+            while not queue.empty():
+                i = queue.get_nowait()
+                payload = build_payload(i, text, args, rng)
+                start = time.perf_counter()
+                try:
+                    res = await client.post("/extract", json=payload)
+                    status = res.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                results.append((status, time.perf_counter() - start, "extractionPipeline" in payload))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+async def run(args):
+    provider_app, provider_stats = make_fake_provider(args.latency_ms, args.latency_sigma, args.error_rate, args.seed)
+    provider_port = _free_port()
+    provider_server, provider_thread = serve_in_thread(provider_app, provider_port)
+
+    os.environ["EXTERNAL_LLM_API_BASE_URL"] = f"http://127.0.0.1:{provider_port}/v1"
+    os.environ.setdefault("EXTERNAL_LLM_API_KEY", "load-test")
+    os.environ["API_ACCESS_TOKEN"] = ""
+
+    import app as app_module
+    import similarity_search
+
+    if args.embedding_model == "hash":
+        from benchmarks.run_benchmarks import HashingEncoder
+
+        similarity_search._model = HashingEncoder()
+
+    # The API gets its own loop: lag sampled there is the API's, not the driver's.
+    lag_samples = []
+    api_port = _free_port()
+    api_server, api_thread = await asyncio.to_thread(serve_in_thread, app_module.app, api_port, lag_samples)
+
+    with open(INPUT_FILE, encoding="utf-8") as f:
+        text = f.read()
+
+    # Untimed warm-up: loads tokenizers/models and opens provider connections.
+    if args.warmup:
+        warmup_args = argparse.Namespace(**{**vars(args), "requests": args.warmup, "concurrency": 1,
+                                            "pipeline_ratio": 1.0 if args.pipeline_ratio else 0.0})
+        await drive(f"http://127.0.0.1:{api_port}", warmup_args, text)
+        lag_samples.clear()
+        provider_stats.update(calls=0, errors=0)
+
+    print(f"Driving {args.requests} requests at concurrency {args.concurrency} "
+          f"(provider median {args.latency_ms} ms, sigma {args.latency_sigma}, error rate {args.error_rate:.1%})")
+    results, elapsed = await drive(f"http://127.0.0.1:{api_port}", args, text)
+
+    api_server.should_exit = True
+    await asyncio.to_thread(api_thread.join)
+    provider_server.should_exit = True
+    provider_thread.join()
+
+    ok = [latency for status, latency, _ in results if status == 200]
+    failures = {}
+    for status, _, _ in results:
+        if status != 200:
+            failures[status] = failures.get(status, 0) + 1
+
+    report = {
+        "requests": len(results),
+        "succeeded": len(ok),
+        "failures": failures,
+        "pipeline_requests": sum(1 for _, _, pipeline in results if pipeline),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(results) / elapsed if elapsed else None,
+        "latency_s": percentiles(ok),
+        "event_loop_lag_s": percentiles(lag_samples),
+        "provider": provider_stats,
+    }
+    print(json.dumps(report, indent=4))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--model-id", default="gpt-oss-120b")
+    parser.add_argument("--pipeline-ratio", type=float, default=0.0,
+                        help="share of requests sent as two-extractor + judge pipelines")
+    parser.add_argument("--same-text", action="store_true",
+                        help="send identical postings (exercises coalescing and caching)")
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="median fake provider latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal sigma of provider latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of provider calls answered with 500")
+    parser.add_argument("--embedding-model", choices=["real", "hash"], default="real")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed requests sent before the run")
+    parser.add_argument("--timeout", type=float, default=240.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import json
+import os
+import time
+
+import requests
+
+# Streams /extract/stream and prints each event as it arrives
+API_URL = "YOUR_URL"  # e.g. http://localhost:8000/extract/stream
+MODEL_ID = "gpt-oss-120b"
+INPUT_FILE = "dummy_input.md"
+
+# Optional: Add your API token if security is enabled on the server
+API_TOKEN = "XXX"
+
+USER_PROFILE = {
+    "skills": ["Java", "Python", "Spring Boot", "PostgreSQL"],
+    "experiences": ["4 Years of Software development"],
+    "qualifications": ["Bsc. Wirtschaftsinformatik"],
+}
+
+headers = {
+    "Content-Type": "application/json"
+}
+if API_TOKEN:
+    headers["Authorization"] = f"Bearer {API_TOKEN}"
+
+if not os.path.exists(INPUT_FILE):
+    print(f"Input file not found: {INPUT_FILE}")
+    exit()
+
+with open(INPUT_FILE, "r", encoding="utf-8") as f:
+    markdown_content = f.read()
+
+payload = {
+    "modelId": MODEL_ID,
+    "inputText": markdown_content,
+    "userProfile": USER_PROFILE
+}
+
+start_time = time.time()
+# (connect, read) timeout: the read timeout only has to cover the gap between two events.
+with requests.post(API_URL, headers=headers, data=json.dumps(payload), stream=True, timeout=(10, 120)) as response:
+    print("Status code:", response.status_code)
+    if response.status_code != 200:
+        print("Error:", response.text)
+        exit()
+
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        event = json.loads(line)
+        print(f"[{time.time() - start_time:6.1f}s] {event['event']}")
+        print(json.dumps(event, indent=4, ensure_ascii=False))
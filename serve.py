@@ -0,0 +1,171 @@
+"""Serve the API with several worker processes forked from one preloaded parent.
+
+The parent imports the application and its heavy libraries, then loads the
+embedding model, the tokenizers and the prompt templates. After that it forks the
+workers. The workers share those pages copy-on-write with the parent instead of
+each holding a copy.
+
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+
+Every worker accepts connections on the same listening socket. The parent restarts
+workers that die and logs each worker's RSS, PSS and USS (its private memory)
+periodically. Each worker also exports them as jobmatcher_process_memory_bytes.
+Linux only (fork and /proc).
+"""
+import argparse
+from contextlib import suppress
+import gc
+import os
+import signal
+import socket
+import time
+import traceback
+
+import uvicorn
+
+from metrics import process_memory
+
+
+def preload():
+    """Load what every worker needs once, in the parent, before forking."""
+    # Importing is a large part of each worker's footprint: fastapi, pydantic models,
+    # openai, outlines and transformers.
+    import app  # noqa: F401
+    import openai  # noqa: F401
+    import outlines  # noqa: F401
+
+    from external_model import EXTERNAL_MODELS_CONFIG
+    import similarity_search
+    from utils import load_template, load_token_counter
+
+    # Weights only. The warm-up inference runs in each worker (app lifespan), so no
+    # torch/OpenMP thread pool is started before the fork.
+    similarity_search.check_backend()
+    try:
+        similarity_search.get_model()
+    except Exception as e:
+        print(f"Preloading the embedding model failed, workers will load it themselves: {e}")
+    for config in EXTERNAL_MODELS_CONFIG.values():
+        load_token_counter(config.get("tokenizer"))
+    load_template("prompt_template.txt")
+    load_template("prompt_judge_template.txt")
+    # Extractor instances are not built here: their HTTP connection pools must not be
+    # shared between processes. Each worker builds them on first use (or warm-up).
+
+    # Move everything allocated so far to the permanent generation. The workers'
+    # collector then never traverses these objects, so it does not write to their
+    # pages (which would copy them into every worker).
+    gc.collect()
+    gc.freeze()
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock, log_level="info"):
+    import app
+
+    server = uvicorn.Server(uvicorn.Config(app.app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def fork_worker(target):
+    """Fork a child that runs ``target()`` and exits; returns the child's pid."""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            target()
+            code = 0
+        except BaseException:
+            # os._exit skips the interpreter's own error report.
+            traceback.print_exc()
+        finally:
+            os._exit(code)
+    return pid
+
+
+def memory_report(pids):
+    """One line per process: RSS, PSS and USS in MiB."""
+    lines = []
+    for label, pid in pids:
+        mem = process_memory(pid)
+        if mem:
+            lines.append(f"{label} (pid {pid}): rss {mem['rss'] / 2**20:.0f} MiB, "
+                         f"pss {mem['pss'] / 2**20:.0f} MiB, uss {mem['uss'] / 2**20:.0f} MiB")
+    return "\n".join(lines)
+
+
+def supervise(workers, target, report_interval=60.0, poll_interval=0.5):
+    """Fork ``workers`` children running ``target`` and wait for them.
+
+    A worker that dies abnormally (non-zero exit or a signal) is replaced. SIGTERM or
+    SIGINT stops all workers; returns once every worker has exited.
+    """
+    children = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            # The child may have exited and been reaped already.
+            with suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+
+    previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        for i in range(workers):
+            children[fork_worker(target)] = i
+
+        next_report = time.monotonic() + report_interval
+        while children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                if report_interval and time.monotonic() >= next_report:
+                    report = memory_report([("parent", os.getpid())]
+                                           + [(f"worker {i}", p) for p, i in sorted(children.items())])
+                    print(report, flush=True)
+                    next_report = time.monotonic() + report_interval
+                time.sleep(poll_interval)
+                continue
+
+            i = children.pop(pid)
+            if status != 0 and not stopping:
+                print(f"Worker {i} (pid {pid}) exited with status {status}; restarting", flush=True)
+                time.sleep(1)
+                children[fork_worker(target)] = i
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--memory-report-seconds", type=float, default=60.0,
+                        help="interval of the per-worker memory log (0 disables)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    sock = bind_socket(args.host, args.port)
+    preload()
+    if args.workers <= 1:
+        run_worker(sock, args.log_level)
+        return
+    print(f"Preloaded; forking {args.workers} workers on {args.host}:{args.port}", flush=True)
+    supervise(args.workers, lambda: run_worker(sock, args.log_level), args.memory_report_seconds)
+
+
+if __name__ == "__main__":
+    main()
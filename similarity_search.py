@@ -1,59 +1,233 @@
-from typing import List, Dict
+import importlib.util
+import os
+import threading
+from typing import List, Dict, Optional
 
-from sentence_transformers import SentenceTransformer, util
-import torch
+import numpy as np
 
-from api_schema import UserProfile, Requirements, SimilarityScore
+from api_schema import SkillExperienceBase, UserProfile, Requirements, SimilarityScore
+from batching import MicroBatcher
+from embedding_cache import EmbeddingCache, encode_cached
+import metrics
+from utils import normalize_requirement_item
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# "torch" (SentenceTransformer), "onnx" or "onnx-int8" (onnxruntime, no torch import).
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+# Packages of the uv extra each backend needs; a plain `uv sync` installs neither.
+BACKEND_EXTRAS = {
+    "torch": ("torch", ["torch", "sentence_transformers"]),
+    "onnx": ("onnx", ["onnxruntime", "tokenizers", "huggingface_hub"]),
+    "onnx-int8": ("onnx", ["onnxruntime", "tokenizers", "huggingface_hub"]),
+}
+
+REQUIREMENT_FIELDS = ["skills", "experiences", "qualifications"]
+DEFAULT_WEIGHTS = {"skills": 0.5, "experiences": 0.3, "qualifications": 0.2}
 
 # Global model instance to avoid reloading on every call
 _model = None
+_embedding_cache = None
+_embedding_batcher = None
+_init_lock = threading.Lock()
+
+
+def get_backend() -> str:
+    backend = os.getenv("EMBEDDING_BACKEND", "torch")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    return backend
+
+
+def check_backend() -> str:
+    """The configured backend; raises RuntimeError naming the extra to install if it is missing."""
+    backend = get_backend()
+    extra, packages = BACKEND_EXTRAS[backend]
+    missing = [package for package in packages if importlib.util.find_spec(package) is None]
+    if missing:
+        raise RuntimeError(f"EMBEDDING_BACKEND={backend} needs the '{extra}' extra (missing: {', '.join(missing)}); "
+                           f"install it with `uv sync --extra {extra}`")
+    return backend
+
+
+def load_model(backend: str = "torch"):
+    """Build the embedding model for ``backend``; anything with ``encode(list[str])``."""
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(MODEL_NAME)
 
+    from onnx_encoder import OnnxSentenceEncoder
 
-def get_model() -> SentenceTransformer:
+    return OnnxSentenceEncoder.from_pretrained(
+        quantized=backend == "onnx-int8",
+        model_file=os.getenv("EMBEDDING_ONNX_FILE") or None,
+        local_dir=os.getenv("EMBEDDING_ONNX_DIR") or None,
+    )
+
+
+def get_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
+        # The warm-up thread and request threads may get here together; load once.
+        with _init_lock:
+            if _model is None:
+                _model = load_model(get_backend())
     return _model
 
 
+def _cache_namespace() -> str:
+    # Backends produce slightly different vectors; never mix them in the cache.
+    backend = get_backend()
+    return MODEL_NAME if backend == "torch" else f"{MODEL_NAME}:{backend}"
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Shared embedding cache; EMBEDDING_CACHE_SIZE=0 disables it, EMBEDDING_CACHE_PATH persists it."""
+    global _embedding_cache
+    with _init_lock:
+        if _embedding_cache is None:
+            max_entries = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+            if max_entries <= 0:
+                return None
+            _embedding_cache = EmbeddingCache(max_entries=max_entries,
+                                              path=os.getenv("EMBEDDING_CACHE_PATH") or None)
+        return _embedding_cache
+
+
+class EmbeddingBatcher(MicroBatcher):
+    """Coalesces encode requests from concurrent callers into larger forward passes."""
+
+    def __init__(self, encode, max_batch_size: int = 256, max_wait_ms: float = 5.0):
+        super().__init__(lambda texts: np.asarray(encode(texts)), max_batch_size, max_wait_ms, name="embedding-batcher")
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.submit(texts)
+
+    def _select(self, results, rows):
+        if not rows:
+            return np.empty((0, 0), dtype=np.float32)
+        return results[rows]
+
+
+def get_embedding_batcher() -> Optional[EmbeddingBatcher]:
+    """Shared micro-batcher for the managed model; enabled when EMBEDDING_BATCH_MAX_WAIT_MS > 0."""
+    global _embedding_batcher
+    # Each batcher owns a thread; concurrent first callers must not start two.
+    with _init_lock:
+        if _embedding_batcher is None:
+            max_wait_ms = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "0"))
+            if max_wait_ms <= 0:
+                return None
+            _embedding_batcher = EmbeddingBatcher(
+                lambda texts: _model_encode(get_model(), texts),
+                max_batch_size=int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "256")),
+                max_wait_ms=max_wait_ms,
+            )
+        return _embedding_batcher
+
+
+def _to_numpy(embeddings) -> np.ndarray:
+    # SentenceTransformer/ONNX return ndarrays; CPU tensors from custom encoders convert as-is.
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _model_encode(model, texts: List[str]) -> np.ndarray:
+    """One call into the embedding model, recorded in the embedding metrics."""
+    label = _cache_namespace() if model is _model else type(model).__name__
+    metrics.EMBEDDING_BATCH_SIZE.labels(model=label).observe(len(texts))
+    with metrics.timed("embedding", label):
+        return _to_numpy(model.encode(texts))
+
+
+def encode_texts(items: List[str], model) -> np.ndarray:
+    """Encode ``items`` into a (len(items), dim) float32 array.
+
+    Only the managed model from get_model() goes through the embedding cache and the
+    micro-batcher, since its vectors are the ones keyed by the model name.
+    """
+    if model is not _model:
+        return _model_encode(model, items)
+
+    cache = get_embedding_cache()
+    batcher = get_embedding_batcher()
+    if cache is None and batcher is None:
+        return _model_encode(model, items)
+
+    def encode(texts):
+        return _model_encode(model, texts)
+
+    return encode_cached(items, batcher.encode if batcher else encode, _cache_namespace(), cache)
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=-1, keepdims=True), 1e-12)
+
+
+def _cos_sim(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarity, shape (len(a), len(b))."""
+    return _normalize(a) @ _normalize(b).T
+
+
+def _maxsim(user_embeddings: np.ndarray, job_embeddings: np.ndarray) -> float:
+    cosine_scores = _cos_sim(job_embeddings, user_embeddings)
+
+    # For each job requirement (row), find the max score across user items (columns)
+    max_scores = cosine_scores.max(axis=1)
+
+    return float(max_scores.mean())
+
+
 def compute_maxsim(user_items: List[str],
-                   job_items: List[str], model: SentenceTransformer
+                   job_items: List[str], model
                    ) -> float:
     if not user_items or not job_items:
         return 0.0
 
-    user_embeddings = model.encode(user_items, convert_to_tensor=True)
-    job_embeddings = model.encode(job_items, convert_to_tensor=True)
-
-    cosine_scores = util.cos_sim(job_embeddings, user_embeddings)
-
-    # For each job requirement (row), find the max score across user items (columns)
-    max_scores, _ = torch.max(cosine_scores, dim=1)
+    user_embeddings = encode_texts(user_items, model)
+    job_embeddings = encode_texts(job_items, model)
 
-    return max_scores.mean().item()
+    return _maxsim(user_embeddings, job_embeddings)
 
 
 def compute_similarity(
         user_profile: UserProfile,
         extracted_requirements: Requirements,
-        weights: Dict[str, float] = None
+        weights: Dict[str, float] = None,
+        model=None
 ) -> SimilarityScore:
     if weights is None:
-        weights = {"skills": 0.5, "experiences": 0.3, "qualifications": 0.2}
+        weights = DEFAULT_WEIGHTS
 
-    model = get_model()
+    if model is None:
+        model = get_model()
 
-    requirement_fields = ['skills', 'experiences', 'qualifications']
+    requirement_fields = REQUIREMENT_FIELDS
 
-    overall_scores: Dict[str, float] = {}
+    overall_scores: Dict[str, float] = {field: 0.0 for field in requirement_fields}
 
+    # Fields where either side is empty score 0 and need no embeddings.
+    pairs = {}
     for field in requirement_fields:
         user_items = getattr(user_profile, field, [])
         job_items = getattr(extracted_requirements, field, [])
+        if user_items and job_items:
+            pairs[field] = (user_items, job_items)
 
-        # Compute MaxSim score for this field
-        score = compute_maxsim(user_items, job_items, model)
-        overall_scores[field] = score
+    if pairs:
+        # One deduplicated forward pass for every string of every field.
+        texts = list(dict.fromkeys(
+            text for user_items, job_items in pairs.values() for text in (*user_items, *job_items)
+        ))
+        embeddings = encode_texts(texts, model)
+        row_of = {text: i for i, text in enumerate(texts)}
+
+        for field, (user_items, job_items) in pairs.items():
+            # Compute MaxSim score for this field
+            overall_scores[field] = _maxsim(
+                embeddings[[row_of[t] for t in user_items]],
+                embeddings[[row_of[t] for t in job_items]],
+            )
 
     # Calculate weighted average
     weighted_score = sum(
@@ -62,3 +236,128 @@ def compute_similarity(
     )
 
     return SimilarityScore(score=weighted_score)
+
+
+def compute_similarity_batch(
+        user_profiles: List[UserProfile],
+        extracted_requirements: Requirements,
+        weights: Dict[str, float] = None
+) -> List[SimilarityScore]:
+    """Score many profiles against one set of requirements.
+
+    Same weighted MaxSim as compute_similarity, but every string is encoded in one
+    batch and each field is scored for all profiles with a single cos_sim matrix.
+    """
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+
+    model = get_model()
+
+    fields = [f for f in REQUIREMENT_FIELDS if getattr(extracted_requirements, f, [])]
+    texts = list(dict.fromkeys(
+        text
+        for field in fields
+        for text in (*getattr(extracted_requirements, field),
+                     *(t for profile in user_profiles for t in getattr(profile, field, [])))
+    ))
+
+    if not texts:
+        return [SimilarityScore(score=0.0) for _ in user_profiles]
+
+    weighted = np.zeros(len(user_profiles), dtype=np.float64)
+    embeddings = encode_texts(texts, model)
+    row_of = {text: i for i, text in enumerate(texts)}
+
+    for field in fields:
+        job_items = getattr(extracted_requirements, field)
+        user_rows, starts, owners = [], [], []
+        for p, profile in enumerate(user_profiles):
+            items = getattr(profile, field, [])
+            if items:
+                starts.append(len(user_rows))
+                owners.append(p)
+                user_rows.extend(row_of[text] for text in items)
+        if not user_rows:
+            continue
+
+        # (all profile items, job items) similarity matrix for every profile at once.
+        cosine_scores = _cos_sim(embeddings[user_rows], embeddings[[row_of[t] for t in job_items]])
+
+        # Each profile's items are contiguous rows, so one reduceat gives every
+        # profile's per-requirement max; profiles without items stay 0.
+        max_scores = np.maximum.reduceat(cosine_scores, starts, axis=0)
+        weighted[owners] += max_scores.mean(axis=1, dtype=np.float64) * weights.get(field, 0.0)
+
+    return [SimilarityScore(score=score) for score in weighted.tolist()]
+
+
+def max_score_drift(pairs, model, reference_model, weights: Dict[str, float] = None) -> float:
+    """Largest absolute compute_similarity difference between two embedding models.
+
+    Used to check that an alternative backend (e.g. int8 ONNX) stays within tolerance
+    of the torch reference over a set of (UserProfile, Requirements) pairs.
+    """
+    return max(
+        (abs(compute_similarity(profile, requirements, weights, model=model).score
+             - compute_similarity(profile, requirements, weights, model=reference_model).score)
+         for profile, requirements in pairs),
+        default=0.0,
+    )
+
+
+def encode_items(texts: List[str]) -> np.ndarray:
+    """(len(texts), dim) normalized float32 embeddings from the managed model."""
+    return _normalize(encode_texts(texts, get_model()))
+
+
+def encode_fields(items: SkillExperienceBase) -> Dict[str, np.ndarray]:
+    """Per-field (items, dim) normalized float32 embeddings, encoded in one batch."""
+    texts = list(dict.fromkeys(t for field in REQUIREMENT_FIELDS for t in getattr(items, field, [])))
+    if not texts:
+        return {}
+
+    embeddings = encode_items(texts)
+    row_of = {text: i for i, text in enumerate(texts)}
+    return {
+        field: embeddings[[row_of[t] for t in getattr(items, field)]]
+        for field in REQUIREMENT_FIELDS
+        if getattr(items, field, [])
+    }
+
+
+def dedupe_requirements(requirements: SkillExperienceBase, threshold: float) -> SkillExperienceBase:
+    """Keep one canonical item per cluster of near-duplicate items in each field.
+
+    Items that normalize to the same text ("Python", "python.") are repeats. The
+    rest are clustered greedily by cosine similarity, shortest first: an item
+    whose similarity to an already kept item is at least ``threshold`` is dropped.
+    So "Python programming" collapses into "Python". Items are never merged
+    across fields; kept items stay in input order.
+    """
+    unique = {}
+    for field in REQUIREMENT_FIELDS:
+        by_form = {}
+        for item in getattr(requirements, field, []):
+            form = normalize_requirement_item(item)
+            if form and form not in by_form:
+                by_form[form] = item.strip()
+        unique[field] = list(by_form.values())
+
+    texts = list(dict.fromkeys(t for items in unique.values() if len(items) > 1 for t in items))
+    embeddings = encode_items(texts) if texts else None
+    row_of = {text: i for i, text in enumerate(texts)}
+
+    deduped = {}
+    for field, items in unique.items():
+        if len(items) < 2:
+            deduped[field] = items
+            continue
+        vectors = embeddings[[row_of[t] for t in items]]
+        kept = []
+        for i in sorted(range(len(items)), key=lambda i: (len(items[i]), i)):
+            if kept and float((vectors[kept] @ vectors[i]).max()) >= threshold:
+                continue
+            kept.append(i)
+        deduped[field] = [items[i] for i in sorted(kept)]
+
+    return requirements.model_copy(update=deduped)
@@ -0,0 +1,52 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesce concurrent async calls that share a key into one in-progress call.
+
+    The first caller for a key starts the work; callers arriving while it runs
+    await the same result (or exception). A cancelled waiter does not cancel the
+    shared call while other callers still wait for it; when the last one is
+    cancelled, so is the call. Keys are forgotten as soon as the call finishes, so
+    nothing is cached beyond its lifetime.
+    """
+
+    def __init__(self, on_coalesce=None):
+        self._calls = {}
+        self._waiters = {}
+        self._on_coalesce = on_coalesce
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            if self._on_coalesce is not None:
+                self._on_coalesce()
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters.get(task) == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            remaining = self._waiters.pop(task, 1) - 1
+            if remaining:
+                self._waiters[task] = remaining
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the outcome as retrieved even if every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {"started": self.started, "coalesced": self.coalesced, "in_flight": len(self._calls)}
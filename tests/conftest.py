@@ -16,11 +16,21 @@ if str(_PROJECT_DIR) not in sys.path:
 def _clear_model_caches():
     """Ensure module-level caches don’t leak between tests."""
     # Import from the local modules under implementation/job_matching_system.
-    import base_model, external_model, similarity_search
+    import base_model, embedding_pool, external_model, http_transport, job_index, llm_cache, profile_store, similarity_search
 
     base_model._MODEL_INSTANCES.clear()
     external_model._MODEL_INSTANCES.clear()
+    llm_cache._cache = None
+    http_transport._client = None
+    http_transport._async_client = None
+    job_index._index = None
+    profile_store._store = None
+    embedding_pool.shutdown()
     similarity_search._model = None
+    similarity_search._embedding_cache = None
+    if similarity_search._embedding_batcher is not None:
+        similarity_search._embedding_batcher.close()
+        similarity_search._embedding_batcher = None
 
 
 @pytest.fixture
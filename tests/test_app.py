@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 
 
@@ -9,7 +10,7 @@ def test_extract_endpoint_happy_path(monkeypatch):
     from api_schema import Requirements, SimilarityScore
 
     class StubExtractor:
-        def process_text(self, text):
+        async def process_text_async(self, text):
             return Requirements(skills=["python"], experiences=[], qualifications=[])
 
     monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: StubExtractor())
@@ -82,20 +83,20 @@ def test_extract_endpoint_ensemble_pipeline(monkeypatch):
     calls = []
 
     class ExtractorA:
-        def process_text(self, text):
+        async def process_text_async(self, text):
             calls.append(("a", text))
             return Requirements(skills=["python"], experiences=[], qualifications=[])
 
     class ExtractorB:
-        def process_text(self, text):
+        async def process_text_async(self, text):
             calls.append(("b", text))
             return Requirements(skills=["fastapi"], experiences=["3 years"], qualifications=[])
 
     class Judge:
-        def process_text(self, text):
+        async def process_text_async(self, text):
             raise AssertionError("judge should not be used for extraction")
 
-        def judge_requirements(self, input_text, requirements):
+        async def judge_requirements_async(self, input_text, requirements):
             calls.append(("judge", input_text, requirements.model_dump()))
             return Requirements(
                 skills=sorted(requirements.skills + ["docker"]),
@@ -138,4 +139,477 @@ def test_extract_endpoint_ensemble_pipeline(monkeypatch):
     assert body["jobRequirements"]["experiences"] == ["3 years"]
     assert body["similarityScore"]["score"] == 0.9
 
-    assert [c[0] for c in calls] == ["a", "b", "judge"]
+    assert sorted(c[0] for c in calls[:2]) == ["a", "b"]
+    assert calls[2][0] == "judge"
+
+
+def test_extract_endpoint_pipeline_runs_extractors_concurrently(monkeypatch):
+    import asyncio
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+    from api_schema import Requirements, SimilarityScore
+
+    started = []
+
+    class Extractor:
+        def __init__(self, skill):
+            self.skill = skill
+
+        async def process_text_async(self, text):
+            # Times out unless both extractors are in flight at the same time.
+            started.append(self.skill)
+            async with asyncio.timeout(5):
+                while len(started) < 2:
+                    await asyncio.sleep(0.01)
+            return Requirements(skills=[self.skill])
+
+        async def judge_requirements_async(self, input_text, requirements):
+            return requirements
+
+    extractors = {"a": Extractor("python"), "b": Extractor("docker"), "judge": Extractor("unused")}
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: extractors[model_id])
+    monkeypatch.setattr(app_module, "compute_similarity", lambda user, req: SimilarityScore(score=0.1))
+
+    client = TestClient(app_module.app)
+    payload = {
+        "modelId": "a",
+        "extractionPipeline": {"extractorModelIds": ["a", "b"], "judgeModelId": "judge"},
+        "inputText": "job text",
+        "userProfile": {"skills": [], "experiences": [], "qualifications": []},
+    }
+    res = client.post("/extract", json=payload, headers={"Authorization": "Bearer testtoken"})
+
+    assert res.status_code == 200
+    assert res.json()["jobRequirements"]["skills"] == ["docker", "python"]
+
+
+def test_extract_endpoint_pipeline_surfaces_first_extractor_error(monkeypatch):
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+    from api_schema import Requirements
+
+    class Failing:
+        async def process_text_async(self, text):
+            raise RuntimeError("provider down")
+
+    class Ok:
+        async def process_text_async(self, text):
+            return Requirements()
+
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: Failing() if model_id == "a" else Ok())
+
+    client = TestClient(app_module.app)
+    payload = {
+        "modelId": "a",
+        "extractionPipeline": {"extractorModelIds": ["a", "b"], "judgeModelId": "b"},
+        "inputText": "job text",
+        "userProfile": {"skills": [], "experiences": [], "qualifications": []},
+    }
+    res = client.post("/extract", json=payload, headers={"Authorization": "Bearer testtoken"})
+
+    assert res.status_code == 500
+    assert res.json()["detail"] == "provider down"
+
+
+def test_extract_batch_extracts_once_and_ranks_profiles(monkeypatch):
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+    from api_schema import Requirements, SimilarityScore
+
+    calls = []
+
+    class StubExtractor:
+        async def process_text_async(self, text):
+            calls.append(text)
+            return Requirements(skills=["python"])
+
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: StubExtractor())
+    monkeypatch.setattr(
+        app_module,
+        "compute_similarity_batch",
+        lambda profiles, req: [SimilarityScore(score=s) for s in (0.2, 0.9, 0.5)],
+    )
+
+    client = TestClient(app_module.app)
+    payload = {
+        "modelId": "gpt-oss-120b",
+        "inputText": "job text",
+        "userProfiles": [{"skills": ["a"]}, {"skills": ["b"]}, {"skills": ["c"]}],
+        "topK": 2,
+    }
+    res = client.post("/extract/batch", json=payload, headers={"Authorization": "Bearer testtoken"})
+
+    assert res.status_code == 200
+    body = res.json()
+    assert calls == ["job text"]
+    assert body["jobRequirements"]["skills"] == ["python"]
+    assert [(m["profileIndex"], m["similarityScore"]["score"]) for m in body["matches"]] == [(1, 0.9), (2, 0.5)]
+
+
+def test_jobs_ingest_and_rank(monkeypatch):
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import numpy as np
+
+    import app as app_module
+    from api_schema import Requirements
+
+    vectors = {"python": [1.0, 0.0], "java": [0.0, 1.0]}
+
+    class StubExtractor:
+        async def process_text_async(self, text):
+            return Requirements(skills=[text])
+
+    def fake_encode_fields(items):
+        return {"skills": np.array([vectors[s] for s in items.skills], dtype=np.float32)} if items.skills else {}
+
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: StubExtractor())
+    monkeypatch.setattr(app_module, "encode_fields", fake_encode_fields)
+
+    client = TestClient(app_module.app)
+    headers = {"Authorization": "Bearer testtoken"}
+    for job_id, text in [("j1", "python"), ("j2", "java")]:
+        res = client.post("/jobs", json={"jobId": job_id, "modelId": "m", "inputText": text}, headers=headers)
+        assert res.status_code == 200
+        assert res.json()["jobRequirements"]["skills"] == [text]
+
+    res = client.post("/jobs/rank", json={"userProfile": {"skills": ["java"]}, "topK": 1}, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["matches"] == [{"jobId": "j2", "similarityScore": {"score": 0.5}}]
+
+    assert client.delete("/jobs/j2", headers=headers).status_code == 204
+    assert client.delete("/jobs/j2", headers=headers).status_code == 404
+
+
+def test_extract_stream_emits_chunks_then_result_then_score(monkeypatch):
+    import json
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+    from api_schema import Requirements, SimilarityScore
+
+    class StubExtractor:
+        def __init__(self, skills):
+            self.skills = skills
+
+        async def process_text_stream(self, text):
+            for i, skill in enumerate(self.skills):
+                yield i, len(self.skills), Requirements(skills=[skill])
+
+        async def judge_requirements_async(self, input_text, requirements):
+            return Requirements(skills=requirements.skills + ["judged"])
+
+    extractors = {"a": StubExtractor(["python", "sql"]), "b": StubExtractor(["docker"]), "judge": StubExtractor([])}
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: extractors[model_id])
+    monkeypatch.setattr(app_module, "compute_similarity", lambda user, req: SimilarityScore(score=0.7))
+
+    client = TestClient(app_module.app)
+    payload = {
+        "modelId": "a",
+        "extractionPipeline": {"extractorModelIds": ["a", "b"], "judgeModelId": "judge"},
+        "inputText": "job text",
+        "userProfile": {"skills": [], "experiences": [], "qualifications": []},
+    }
+    res = client.post("/extract/stream", json=payload, headers={"Authorization": "Bearer testtoken"})
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in res.text.splitlines()]
+    assert [e["event"] for e in events] == ["chunk", "chunk", "chunk", "requirements", "similarity"]
+    assert sorted((e["modelId"], e["chunkIndex"], e["chunkCount"]) for e in events[:3]) == [
+        ("a", 0, 2), ("a", 1, 2), ("b", 0, 1)]
+    assert events[3]["requirements"]["skills"] == ["docker", "python", "sql", "judged"]
+    assert events[4]["similarityScore"] == {"score": 0.7}
+
+
+def test_extract_stream_reports_errors_in_band(monkeypatch):
+    import json
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+    from api_schema import Requirements
+
+    class Failing:
+        async def process_text_stream(self, text):
+            yield 0, 2, Requirements(skills=["python"])
+            raise RuntimeError("provider down")
+
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: Failing())
+
+    client = TestClient(app_module.app)
+    payload = {
+        "modelId": "a",
+        "inputText": "job text",
+        "userProfile": {"skills": [], "experiences": [], "qualifications": []},
+    }
+    res = client.post("/extract/stream", json=payload, headers={"Authorization": "Bearer testtoken"})
+
+    assert res.status_code == 200
+    events = [json.loads(line) for line in res.text.splitlines()]
+    assert [e["event"] for e in events] == ["chunk", "error"]
+    assert events[1]["detail"] == "provider down"
+
+
+def test_metrics_endpoint_exposes_stage_latencies(monkeypatch):
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+    from api_schema import Requirements, SimilarityScore
+
+    class StubExtractor:
+        async def process_text_async(self, text):
+            return Requirements(skills=["python"])
+
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: StubExtractor())
+    monkeypatch.setattr(app_module, "compute_similarity", lambda user, req: SimilarityScore(score=0.5))
+
+    client = TestClient(app_module.app)
+    headers = {"Authorization": "Bearer testtoken"}
+    payload = {"modelId": "m", "inputText": "text", "userProfile": {"skills": ["python"]}}
+    assert client.post("/extract", json=payload, headers=headers).status_code == 200
+
+    assert client.get("/metrics").status_code == 401
+    res = client.get("/metrics", headers=headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    assert 'jobmatcher_stage_seconds_count{model="all-MiniLM-L6-v2",stage="similarity"}' in res.text
+
+
+def _wait_for_readyz(client, timeout=5.0):
+    import time
+
+    deadline = time.monotonic() + timeout
+    while True:
+        res = client.get("/readyz")
+        if res.status_code == 200 or "pending" not in res.json()["components"].values() \
+                or time.monotonic() > deadline:
+            return res
+        time.sleep(0.01)
+
+
+def test_readyz_reports_ready_after_background_warm_up(monkeypatch):
+    import threading
+
+    import app as app_module
+
+    release = threading.Event()
+    encoded, chunked = [], []
+
+    class StubModel:
+        def encode(self, texts):
+            release.wait(5)
+            encoded.append(texts)
+
+    class StubExtractor:
+        def _chunks(self, text):
+            chunked.append(text)
+            return [text]
+
+    monkeypatch.setattr(app_module, "get_model", lambda: StubModel())
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: StubExtractor())
+    monkeypatch.setenv("WARMUP_EXTRACTORS", "gpt-oss-120b,qwen3-next-80b-thinking")
+
+    with TestClient(app_module.app) as client:
+        # Startup does not wait for the models.
+        assert client.get("/healthz").status_code == 200
+        res = client.get("/readyz")
+        assert res.status_code == 503
+        assert res.json()["components"]["embedding_model"] == "pending"
+
+        release.set()
+        res = _wait_for_readyz(client)
+
+    assert res.status_code == 200
+    assert res.json() == {"status": "ready", "components": {"embedding_model": "ready", "extractors": "ready"}}
+    assert encoded == [["warm-up"]]
+    assert len(chunked) == 2
+
+
+def test_readyz_stays_unavailable_when_warm_up_fails(monkeypatch):
+    import app as app_module
+
+    class BrokenModel:
+        def encode(self, texts):
+            raise RuntimeError("no weights")
+
+    monkeypatch.setattr(app_module, "get_model", lambda: BrokenModel())
+    monkeypatch.setenv("WARMUP_EXTRACTORS", "")
+
+    with TestClient(app_module.app) as client:
+        res = _wait_for_readyz(client)
+
+    assert res.status_code == 503
+    assert res.json()["components"] == {"embedding_model": "failed: no weights", "extractors": "ready"}
+
+
+def test_importing_app_does_not_load_heavy_dependencies():
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    code = ("import sys, app; "
+            "print(sorted(m for m in ('torch', 'transformers', 'sentence_transformers', 'outlines', 'openai') "
+            "if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_extract_returns_503_when_embedding_pool_is_full(monkeypatch):
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+    from api_schema import Requirements
+    from embedding_pool import EmbeddingPoolBusy
+
+    class StubExtractor:
+        async def process_text_async(self, text):
+            return Requirements(skills=["python"], experiences=[], qualifications=[])
+
+    class FullPool:
+        async def run(self, fn, *args):
+            raise EmbeddingPoolBusy("queue full")
+
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: StubExtractor())
+    monkeypatch.setattr(app_module, "get_embedding_pool", lambda: FullPool())
+
+    client = TestClient(app_module.app)
+    payload = {
+        "modelId": "qwen3-8b",
+        "inputText": "text",
+        "userProfile": {"skills": ["python"], "experiences": [], "qualifications": []},
+    }
+    res = client.post("/extract", json=payload, headers={"Authorization": "Bearer testtoken"})
+
+    assert res.status_code == 503
+    assert res.json()["detail"] == "queue full"
+
+
+def test_profiles_encode_only_new_items_and_score_by_id(monkeypatch):
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+    import similarity_search
+    from api_schema import Requirements
+    from benchmarks.run_benchmarks import HashingEncoder
+
+    encoded = []
+
+    class CountingEncoder(HashingEncoder):
+        def encode(self, texts):
+            encoded.extend(texts)
+            return super().encode(texts)
+
+    class StubExtractor:
+        async def process_text_async(self, text):
+            return Requirements(skills=["Python", "Docker"], experiences=["backend development"])
+
+    monkeypatch.setenv("EMBEDDING_CACHE_SIZE", "0")
+    monkeypatch.setattr(similarity_search, "_model", CountingEncoder())
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: StubExtractor())
+
+    client = TestClient(app_module.app)
+    headers = {"Authorization": "Bearer testtoken"}
+    profile = {"skills": ["Python", "SQL"], "experiences": ["3 years backend"], "qualifications": []}
+
+    res = client.put("/profiles/u1", json=profile, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["encodedItems"] == 3
+
+    # Adding one skill embeds just that skill.
+    encoded.clear()
+    profile["skills"].append("Kubernetes")
+    res = client.put("/profiles/u1", json=profile, headers=headers)
+    assert res.json()["encodedItems"] == 1
+    assert encoded == ["Kubernetes"]
+
+    inline = client.post("/extract", json={"modelId": "m", "inputText": "t", "userProfile": profile},
+                         headers=headers).json()
+    encoded.clear()
+    by_id = client.post("/extract", json={"modelId": "m", "inputText": "t", "profileId": "u1"},
+                        headers=headers).json()
+    # Only the extracted requirements are embedded.
+    assert sorted(encoded) == ["Docker", "Python", "backend development"]
+    assert by_id["userProfile"] == profile
+    assert by_id["similarityScore"]["score"] == pytest.approx(inline["similarityScore"]["score"], abs=1e-5)
+
+    res = client.post("/extract/batch", json={"modelId": "m", "inputText": "t", "profileIds": ["u1"]},
+                      headers=headers)
+    assert res.json()["matches"][0]["profileId"] == "u1"
+    assert res.json()["matches"][0]["similarityScore"]["score"] == pytest.approx(by_id["similarityScore"]["score"])
+
+    assert client.get("/profiles/u1", headers=headers).json()["userProfile"] == profile
+    assert client.delete("/profiles/u1", headers=headers).status_code == 204
+    assert client.post("/extract", json={"modelId": "m", "inputText": "t", "profileId": "u1"},
+                       headers=headers).status_code == 404
+
+
+def test_extract_requires_exactly_one_profile_source():
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+
+    client = TestClient(app_module.app)
+    headers = {"Authorization": "Bearer testtoken"}
+    both = {"modelId": "m", "inputText": "t", "profileId": "u1", "userProfile": {"skills": []}}
+
+    assert client.post("/extract", json=both, headers=headers).status_code == 422
+    assert client.post("/extract", json={"modelId": "m", "inputText": "t"}, headers=headers).status_code == 422
+
+
+def test_pipeline_dedupes_before_judge_when_enabled(monkeypatch):
+    import os
+    os.environ["API_ACCESS_TOKEN"] = "testtoken"
+
+    import app as app_module
+    from api_schema import Requirements, SimilarityScore
+
+    judged = []
+
+    class Extractor:
+        def __init__(self, skills):
+            self.skills = skills
+
+        async def process_text_async(self, text):
+            return Requirements(skills=self.skills)
+
+        async def judge_requirements_async(self, input_text, requirements):
+            judged.append(requirements.skills)
+            return Requirements(skills=requirements.skills + ["Python 3"])
+
+    extractors = {"a": Extractor(["Python"]), "b": Extractor(["Python programming"]), "judge": Extractor([])}
+
+    def fake_dedupe(requirements, threshold):
+        assert threshold == 0.85
+        return requirements.model_copy(update={"skills": [s for s in requirements.skills if s == "Python"]})
+
+    monkeypatch.setenv("REQUIREMENT_DEDUP_THRESHOLD", "0.85")
+    monkeypatch.setattr(app_module, "get_extractor_for", lambda model_id: extractors[model_id])
+    monkeypatch.setattr(app_module, "dedupe_requirements", fake_dedupe)
+    monkeypatch.setattr(app_module, "compute_similarity", lambda user, req: SimilarityScore(score=0.5))
+
+    client = TestClient(app_module.app)
+    payload = {
+        "modelId": "a",
+        "extractionPipeline": {"extractorModelIds": ["a", "b"], "judgeModelId": "judge"},
+        "inputText": "job text",
+        "userProfile": {"skills": ["python"]},
+    }
+    res = client.post("/extract", json=payload, headers={"Authorization": "Bearer testtoken"})
+
+    assert res.status_code == 200
+    assert judged == [["Python"]]
+    assert res.json()["jobRequirements"]["skills"] == ["Python"]
@@ -24,7 +24,7 @@ def test_process_text_merges_and_sorts(monkeypatch):
     from api_schema import Requirements
 
     monkeypatch.setattr(base_model.LLMExtractor, "_load_model", lambda self: None)
-    monkeypatch.setattr(base_model, "chunk_markdown", lambda text, size: ["c1", "c2"])
+    monkeypatch.setattr(base_model, "chunk_markdown", lambda text, size, **_: ["c1", "c2"])
 
     def fake_process_chunk(self, chunk):
         if chunk == "c1":
@@ -0,0 +1,27 @@
+import numpy as np
+
+from benchmarks.run_benchmarks import HashingEncoder, find_regressions, make_posting
+
+
+def test_find_regressions_flags_only_slowdowns_beyond_threshold():
+    baseline = {"a": 1.0, "b": 1.0, "c": 1.0}
+    results = {"a": 1.2, "b": 1.6, "c": 0.5, "new": 9.0}
+
+    assert find_regressions(results, baseline, threshold=0.5) == [("b", 1.0, 1.6)]
+
+
+def test_hashing_encoder_is_deterministic():
+    a = HashingEncoder().encode(["python", "java"])
+    b = HashingEncoder().encode(["python", "java"])
+
+    assert a.shape == (2, 384)
+    assert np.array_equal(a, b)
+
+
+def test_make_posting_has_requested_size_and_headings():
+    import random
+
+    posting = make_posting(5_000, random.Random(0))
+
+    assert len(posting) == 5_000
+    assert posting.startswith("## Section 1\n")
@@ -0,0 +1,88 @@
+import numpy as np
+
+
+def _fake_encode(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+    return encode
+
+
+def test_encode_cached_only_encodes_misses():
+    from embedding_cache import EmbeddingCache, encode_cached
+
+    cache = EmbeddingCache(max_entries=10)
+    calls = []
+
+    first = encode_cached(["a", "bb", "a"], _fake_encode(calls), "m", cache)
+    second = encode_cached(["bb", "ccc"], _fake_encode(calls), "m", cache)
+
+    assert calls == [["a", "bb"], ["ccc"]]
+    assert first.shape == (3, 2)
+    assert np.array_equal(first[0], first[2])
+    assert np.array_equal(second[0], first[1])
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_cache_is_keyed_by_model_name():
+    from embedding_cache import EmbeddingCache, encode_cached
+
+    cache = EmbeddingCache(max_entries=10)
+    calls = []
+
+    encode_cached(["a"], _fake_encode(calls), "m1", cache)
+    encode_cached(["a"], _fake_encode(calls), "m2", cache)
+
+    assert calls == [["a"], ["a"]]
+
+
+def test_lru_evicts_least_recently_used():
+    from embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(max_entries=2)
+    vec = np.ones(2, dtype=np.float32)
+    cache.put_many("m", {"a": vec, "b": vec})
+    cache.get_many("m", ["a"])
+    cache.put_many("m", {"c": vec})
+
+    assert set(cache.get_many("m", ["a", "b", "c"])) == {"a", "c"}
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    from embedding_cache import EmbeddingCache
+
+    path = str(tmp_path / "emb.sqlite3")
+    writer = EmbeddingCache(max_entries=10, path=path)
+    writer.put_many("m", {"python": np.array([0.5, 0.25], dtype=np.float32)})
+
+    reader = EmbeddingCache(max_entries=10, path=path)
+    found = reader.get_many("m", ["python", "java"])
+
+    assert list(found) == ["python"]
+    assert found["python"].tolist() == [0.5, 0.25]
+    assert reader.stats()["disk_hits"] == 1
+    assert reader.stats()["misses"] == 1
+
+    reader.get_many("m", ["python"])
+    assert reader.stats()["memory_hits"] == 1
+
+
+def test_lookups_are_counted_per_tier(tmp_path):
+    import metrics
+    from embedding_cache import EmbeddingCache
+
+    def count(tier, result):
+        return metrics.EMBEDDING_CACHE.labels(tier=tier, result=result)._value.get()
+
+    before = {(t, r): count(t, r) for t in ("lru", "sqlite") for r in ("hit", "miss")}
+    path = str(tmp_path / "emb.sqlite3")
+    EmbeddingCache(max_entries=10, path=path).put_many("m", {"python": np.array([1.0], dtype=np.float32)})
+    reader = EmbeddingCache(max_entries=10, path=path)
+    reader.get_many("m", ["python", "java"])
+    reader.get_many("m", ["python"])
+
+    assert {key: count(*key) - value for key, value in before.items()} == {
+        ("lru", "hit"): 1, ("lru", "miss"): 2, ("sqlite", "hit"): 1, ("sqlite", "miss"): 1,
+    }
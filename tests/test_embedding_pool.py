@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def pool():
+    from benchmarks.run_benchmarks import HashingEncoder
+    from embedding_pool import EmbeddingPool
+
+    pool = EmbeddingPool(workers=2, max_queue=4, model_factory=HashingEncoder)
+    yield pool
+    pool.shutdown()
+
+
+def _shared_files():
+    from embedding_pool import SHARED_DIR, _PREFIX
+
+    return [name for name in os.listdir(SHARED_DIR) if name.startswith(_PREFIX)]
+
+
+def test_pool_scores_like_the_in_process_model(pool, monkeypatch):
+    import similarity_search
+    from api_schema import Requirements, UserProfile
+    from benchmarks.run_benchmarks import HashingEncoder
+
+    profile = UserProfile(skills=["Python", "SQL"], experiences=["3 years backend"], qualifications=[])
+    requirements = Requirements(skills=["Python", "Docker"], experiences=["backend development"], qualifications=[])
+    monkeypatch.setattr(similarity_search, "_model", HashingEncoder())
+
+    score = asyncio.run(pool.run(similarity_search.compute_similarity, profile, requirements))
+
+    assert score.score == pytest.approx(similarity_search.compute_similarity(profile, requirements).score)
+
+
+def test_pool_returns_arrays_through_shared_memory(pool, monkeypatch):
+    import similarity_search
+    from api_schema import Requirements
+    from benchmarks.run_benchmarks import HashingEncoder
+
+    requirements = Requirements(skills=["Python", "Docker"], experiences=["backend development"], qualifications=[])
+    monkeypatch.setattr(similarity_search, "_model", HashingEncoder())
+
+    embeddings = asyncio.run(pool.run(similarity_search.encode_fields, requirements))
+    expected = similarity_search.encode_fields(requirements)
+
+    assert set(embeddings) == {"skills", "experiences"}
+    for field, array in embeddings.items():
+        np.testing.assert_allclose(array, expected[field], rtol=1e-6)
+        # A read-only view of the mapped result, not a copy unpickled from the pipe.
+        assert not array.flags.writeable
+        assert not array.flags.owndata
+    # The files are unlinked as soon as they are mapped.
+    assert _shared_files() == []
+
+
+def test_pool_rejects_calls_beyond_its_queue(pool):
+    from embedding_pool import EmbeddingPoolBusy
+
+    async def scenario():
+        running = [asyncio.create_task(pool.run(time.sleep, 0.5)) for _ in range(pool.max_queue)]
+        await asyncio.sleep(0)
+        with pytest.raises(EmbeddingPoolBusy):
+            await pool.run(time.sleep, 0)
+        await asyncio.gather(*running)
+        # Slots are free again once the workers are done.
+        await pool.run(time.sleep, 0)
+
+    asyncio.run(scenario())
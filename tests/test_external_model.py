@@ -19,6 +19,28 @@ def test_get_extractor_for_caches_instances(monkeypatch):
     assert a is b
 
 
+def test_concurrent_get_extractor_for_builds_one_instance(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    import time
+
+    import external_model
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    built = []
+
+    def slow_load(self):
+        built.append(self)
+        time.sleep(0.05)
+
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", slow_load)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        extractors = list(pool.map(external_model.get_extractor_for, ["gpt-oss-120b"] * 4))
+
+    assert len(built) == 1
+    assert all(extractor is built[0] for extractor in extractors)
+
+
 def test_missing_external_api_key_raises(monkeypatch):
     from external_model import ExternalLLMExtractor
 
@@ -33,7 +55,7 @@ def test_process_text_merges_chunks(monkeypatch):
 
     monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
     monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
-    monkeypatch.setattr(external_model, "chunk_markdown", lambda text, size: ["c1", "c2"])
+    monkeypatch.setattr(external_model, "chunk_markdown", lambda text, size, **_: ["c1", "c2"])
 
     def fake_process_chunk(self, chunk):
         if chunk == "c1":
@@ -103,3 +125,324 @@ def test_judge_requirements_cleans_response(monkeypatch):
     assert "\n" not in captured["s"]
     assert "```" not in captured["s"]
     assert "<|return|>" not in captured["s"]
+
+
+def test_process_text_respects_max_concurrency(monkeypatch):
+    import threading
+    import time
+
+    import external_model
+    from api_schema import Requirements
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+    monkeypatch.setattr(external_model, "chunk_markdown", lambda text, size, **_: ["c1", "c2", "c3", "c4"])
+
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def fake_process_chunk(self, chunk):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return Requirements(skills=[chunk])
+
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "process_chunk", fake_process_chunk)
+
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10, max_concurrency=4)
+    res = ex.process_text("ignored", max_concurrency=2)
+
+    assert res.skills == ["c1", "c2", "c3", "c4"]
+    assert state["peak"] == 2
+
+
+def test_process_text_async_merges_chunks_concurrently(monkeypatch):
+    import asyncio
+
+    import external_model
+    from api_schema import Requirements
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+    monkeypatch.setattr(external_model, "chunk_markdown", lambda text, size, **_: ["c1", "c2", "c3"])
+
+    state = {"active": 0, "peak": 0}
+
+    async def fake_process_chunk_async(self, chunk):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return Requirements(skills=[chunk], experiences=["e"] if chunk == "c2" else [])
+
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "process_chunk_async", fake_process_chunk_async)
+
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10, max_concurrency=2)
+    res = asyncio.run(ex.process_text_async("ignored"))
+
+    assert res.skills == ["c1", "c2", "c3"]
+    assert res.experiences == ["e"]
+    assert state["peak"] == 2
+
+
+def test_process_text_stream_yields_chunks_as_they_finish(monkeypatch):
+    import asyncio
+
+    import external_model
+    from api_schema import Requirements
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+    monkeypatch.setattr(external_model, "chunk_markdown", lambda text, size, **_: ["slow", "fast"])
+
+    async def fake_process_chunk_async(self, chunk):
+        await asyncio.sleep(0.05 if chunk == "slow" else 0)
+        return Requirements(skills=[chunk])
+
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "process_chunk_async", fake_process_chunk_async)
+
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10, max_concurrency=2)
+
+    async def collect():
+        return [(i, n, req.skills) async for i, n, req in ex.process_text_stream("ignored")]
+
+    assert asyncio.run(collect()) == [(1, 2, ["fast"]), (0, 2, ["slow"])]
+
+
+def test_judge_requirements_async_falls_back_on_error(monkeypatch):
+    import asyncio
+
+    import external_model
+    from api_schema import Requirements
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10)
+
+    async def failing_generator(*args, **kwargs):
+        raise RuntimeError("timeout")
+
+    ex.async_generator = failing_generator
+    original = Requirements(skills=["python"])
+
+    assert asyncio.run(ex.judge_requirements_async("input", original)) is original
+
+
+def test_generate_async_hedges_to_alternate_model(monkeypatch):
+    import asyncio
+
+    import external_model
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setenv("LLM_HEDGE_PERCENTILE", "50")
+    monkeypatch.setenv("LLM_HEDGE_MIN_SAMPLES", "1")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+
+    slow = external_model.ExternalLLMExtractor(model_name="slow", chunk_size=10, hedge_model="fast")
+    fast = external_model.ExternalLLMExtractor(model_name="fast", chunk_size=10)
+    monkeypatch.setitem(external_model.EXTERNAL_MODELS_CONFIG, "fast", {"model_name": "fast", "chunk_size": 10})
+    external_model._MODEL_INSTANCES["fast"] = fast
+
+    async def slow_generator(*args, **kwargs):
+        await asyncio.sleep(5)
+
+    async def fast_generator(*args, **kwargs):
+        return '{"skills": ["python"]}'
+
+    slow.async_generator = slow_generator
+    fast.async_generator = fast_generator
+    slow.latency.record(0.01)
+
+    res = asyncio.run(slow.process_chunk_async("chunk"))
+
+    assert res.skills == ["python"]
+    stats = slow.stats()
+    assert (stats["calls"], stats["hedged"], stats["hedge_wins"], stats["hedge_rate"]) == (1, 1, 1, 1.0)
+
+
+def test_failed_hedged_calls_are_counted_and_timed(monkeypatch):
+    import asyncio
+    import threading
+
+    import external_model
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setenv("LLM_HEDGE_PERCENTILE", "50")
+    monkeypatch.setenv("LLM_HEDGE_MIN_SAMPLES", "1")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+
+    slow = external_model.ExternalLLMExtractor(model_name="slow", chunk_size=10, hedge_model="fast")
+    fast = external_model.ExternalLLMExtractor(model_name="fast", chunk_size=10)
+    resolved = []
+
+    def get_extractor_for(model_key):
+        resolved.append(threading.current_thread())
+        return fast
+
+    monkeypatch.setattr(external_model, "get_extractor_for", get_extractor_for)
+
+    async def slow_generator(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        raise RuntimeError("timeout")
+
+    async def fast_generator(*args, **kwargs):
+        raise RuntimeError("overloaded")
+
+    slow.async_generator = slow_generator
+    fast.async_generator = fast_generator
+    slow.latency.record(0.01)
+
+    async def run():
+        for i in range(2):
+            assert await slow.process_chunk_async(f"chunk {i}") == external_model.Requirements()
+
+    asyncio.run(run())
+
+    stats = slow.stats()
+    assert (stats["calls"], stats["hedged"], stats["hedge_wins"]) == (2, 2, 0)
+    assert len(slow.latency) == 3
+    assert slow.latency.percentile(100) >= 0.1
+    # The hedge extractor is resolved once, off the event loop.
+    assert len(resolved) == 1 and resolved[0] is not threading.main_thread()
+
+
+def test_generate_async_reads_and_writes_the_cache_off_the_event_loop(monkeypatch):
+    import asyncio
+    import threading
+
+    import external_model
+    import llm_cache
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+    threads = []
+    monkeypatch.setattr(llm_cache, "lookup", lambda key: threads.append(threading.current_thread()))
+    monkeypatch.setattr(llm_cache, "store", lambda key, result: threads.append(threading.current_thread()))
+
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10)
+
+    async def generator(*args, **kwargs):
+        return '{"skills": ["python"]}'
+
+    ex.async_generator = generator
+    asyncio.run(ex.process_chunk_async("chunk"))
+
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def test_hedge_wins_do_not_shrink_the_hedge_delay(monkeypatch):
+    import asyncio
+
+    import external_model
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setenv("LLM_HEDGE_PERCENTILE", "50")
+    monkeypatch.setenv("LLM_HEDGE_MIN_SAMPLES", "1")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10)
+    calls = []
+
+    async def generator(*args, **kwargs):
+        # Every primary call is slow; the hedge (second call of each race) is fast.
+        calls.append(1)
+        if len(calls) % 2:
+            await asyncio.sleep(5)
+        return '{"skills": ["python"]}'
+
+    ex.async_generator = generator
+    for _ in range(5):
+        ex.latency.record(0.02)
+    initial = ex._hedge_delay()
+
+    async def run():
+        for i in range(10):
+            await ex.process_chunk_async(f"chunk {i}")
+
+    asyncio.run(run())
+
+    assert ex.stats()["hedge_wins"] == 10
+    assert ex._hedge_delay() >= initial
+
+
+def test_concurrent_identical_process_text_async_calls_share_one_extraction(monkeypatch):
+    import asyncio
+
+    import external_model
+    from api_schema import Requirements
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+    monkeypatch.setattr(external_model, "chunk_markdown", lambda text, size, **_: [text])
+
+    calls = []
+
+    async def fake_process_chunk_async(self, chunk):
+        calls.append(chunk)
+        await asyncio.sleep(0.01)
+        return Requirements(skills=[chunk])
+
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "process_chunk_async", fake_process_chunk_async)
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10)
+
+    async def burst():
+        return await asyncio.gather(*(ex.process_text_async(t) for t in ["a", "a", "a", "b"]))
+
+    results = asyncio.run(burst())
+
+    assert [r.skills for r in results] == [["a"], ["a"], ["a"], ["b"]]
+    assert sorted(calls) == ["a", "b"]
+    assert ex.stats()["single_flight_coalesced"] == 2
+
+
+def test_failed_chunk_generation_is_counted(monkeypatch):
+    import external_model
+    import metrics
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+    ex = external_model.ExternalLLMExtractor(model_name="metrics-model", chunk_size=10)
+    ex.generator = lambda *args, **kwargs: "not json"
+
+    fallbacks = metrics.LLM_FALLBACKS.labels(model="metrics-model", kind="chunk")
+    before = fallbacks._value.get()
+    assert ex.process_chunk("chunk").skills == []
+    assert fallbacks._value.get() == before + 1
+    assert metrics.RESPONSE_CHARS.labels(model="metrics-model")._sum.get() >= len("not json")
+
+
+def test_api_base_url_can_be_overridden_from_env(monkeypatch):
+    import external_model
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+    monkeypatch.setenv("EXTERNAL_LLM_API_BASE_URL", "http://127.0.0.1:9999/v1")
+
+    assert external_model.ExternalLLMExtractor(model_name="m", chunk_size=10).api_base_url == "http://127.0.0.1:9999/v1"
+    assert external_model.ExternalLLMExtractor(model_name="m", chunk_size=10, api_base_url="http://x/v1").api_base_url == "http://x/v1"
+
+
+def test_process_chunks_async_keeps_chunk_order(monkeypatch):
+    import asyncio
+
+    import external_model
+    from api_schema import Requirements
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+
+    async def fake_process_chunk_async(self, chunk):
+        await asyncio.sleep(0.01 * (3 - int(chunk)))
+        return Requirements(skills=[chunk])
+
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "process_chunk_async", fake_process_chunk_async)
+
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10)
+    results = asyncio.run(ex.process_chunks_async(["1", "2", "3"], max_concurrency=2))
+
+    assert [r.skills for r in results] == [["1"], ["2"], ["3"]]
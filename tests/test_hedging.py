@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from hedging import LatencyTracker, race_with_hedge
+
+
+def test_latency_tracker_percentile_over_window():
+    tracker = LatencyTracker(window=4)
+    assert tracker.percentile(95) is None
+    for seconds in (10.0, 1.0, 2.0, 3.0, 4.0):
+        tracker.record(seconds)
+
+    assert len(tracker) == 4
+    assert tracker.percentile(100) == 4.0
+
+
+def test_race_without_delay_never_hedges():
+    async def primary():
+        return "primary"
+
+    async def hedge():
+        raise AssertionError("hedge should not start")
+
+    assert asyncio.run(race_with_hedge(primary, hedge, None)) == ("primary", False, False)
+    assert asyncio.run(race_with_hedge(primary, hedge, 1.0)) == ("primary", False, False)
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    cancelled = []
+
+    async def primary():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def hedge():
+        return "hedge"
+
+    async def run():
+        result = await race_with_hedge(primary, hedge, 0.01)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == ("hedge", True, True)
+    assert cancelled == [True]
+
+
+def test_failed_hedge_falls_back_to_primary():
+    async def primary():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def hedge():
+        raise RuntimeError("hedge failed")
+
+    assert asyncio.run(race_with_hedge(primary, hedge, 0.01)) == ("primary", True, False)
+
+
+def test_both_failing_raises():
+    async def primary():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("primary failed")
+
+    async def hedge():
+        raise RuntimeError("hedge failed")
+
+    with pytest.raises(RuntimeError, match="primary failed"):
+        asyncio.run(race_with_hedge(primary, hedge, 0.01))
@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+
+
+def test_clients_are_shared_and_configured_from_env(monkeypatch):
+    import http_transport
+
+    monkeypatch.setenv("LLM_HTTP_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "3")
+    monkeypatch.setenv("LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS", "42")
+
+    client = http_transport.get_async_http_client()
+    assert http_transport.get_async_http_client() is client
+    assert http_transport.get_http_client() is http_transport.get_http_client()
+
+    pool = client._transport._pool
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
+    assert pool._keepalive_expiry == 42.0
+
+
+def test_http2_can_be_disabled(monkeypatch):
+    import http_transport
+
+    monkeypatch.setenv("LLM_HTTP2", "0")
+    assert http_transport._client_kwargs()["http2"] is False
+
+
+def test_extractors_share_one_connection_pool(monkeypatch):
+    import external_model
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    a = external_model.ExternalLLMExtractor(model_name="a", chunk_size=10)
+    b = external_model.ExternalLLMExtractor(model_name="b", chunk_size=10)
+
+    assert a.async_client._client is b.async_client._client
+    assert a.client._client is b.client._client
+
+
+def test_prewarm_counts_any_response_and_tolerates_errors(monkeypatch):
+    import http_transport
+
+    monkeypatch.setenv("LLM_HTTP2", "0")
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(404)
+
+    http_transport._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert asyncio.run(http_transport.prewarm("https://llm.example/v1", 3)) == 2
+    assert len(calls) == 3
+
+
+def test_prewarm_opens_one_connection_under_http2(monkeypatch):
+    import http_transport
+
+    monkeypatch.setattr(http_transport, "_http2_enabled", lambda: True)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(404)
+
+    http_transport._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert asyncio.run(http_transport.prewarm("https://llm.example/v1", 3)) == 1
+    assert len(calls) == 1
+
+
+def test_aclose_drops_extractors_bound_to_the_closed_pools(monkeypatch):
+    import external_model
+    import http_transport
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    before = external_model.get_extractor_for("gpt-oss-120b")
+    closed = before.async_client._client
+
+    asyncio.run(http_transport.aclose())
+
+    after = external_model.get_extractor_for("gpt-oss-120b")
+    assert after is not before
+    assert after.async_client._client is http_transport.get_async_http_client()
+    assert after.async_client._client is not closed
+
+
+def test_concurrent_first_callers_share_one_client():
+    from concurrent.futures import ThreadPoolExecutor
+
+    import http_transport
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = list(pool.map(lambda _: http_transport.get_async_http_client(), range(8)))
+
+    assert all(client is clients[0] for client in clients)
@@ -0,0 +1,145 @@
+import numpy as np
+import pytest
+
+WEIGHTS = {"skills": 0.5, "experiences": 0.3, "qualifications": 0.2}
+
+
+def _vec(*values):
+    return np.array([values], dtype=np.float32)
+
+
+def _job(skill, experience=None):
+    from api_schema import Requirements
+
+    embeddings = {"skills": _vec(*skill)}
+    if experience is not None:
+        embeddings["experiences"] = _vec(*experience)
+    return Requirements(skills=["s"]), embeddings
+
+
+def test_search_ranks_by_weighted_maxsim():
+    from job_index import JobIndex
+
+    index = JobIndex()
+    index.add("a", *_job((1, 0, 0), (0, 1, 0)))
+    index.add("b", *_job((0, 1, 0)))
+    index.add("c", *_job((1, 1, 0)))
+
+    profile = {"skills": _vec(1, 0, 0), "experiences": _vec(0, 1, 0)}
+    ranked = index.search(profile, k=2, weights=WEIGHTS)
+
+    assert [job_id for job_id, _ in ranked] == ["a", "c"]
+    assert ranked[0][1] == pytest.approx(0.5 + 0.3)
+    assert ranked[1][1] == pytest.approx(0.5 * np.sqrt(0.5))
+
+
+def test_prefilter_limits_exact_rescoring_to_candidates():
+    from job_index import JobIndex
+
+    index = JobIndex()
+    for i in range(50):
+        index.add(f"far{i}", *_job((0, 0, 1)))
+    index.add("near", *_job((1, 0, 0)))
+
+    ranked = index.search({"skills": _vec(1, 0, 0)}, k=1, weights=WEIGHTS, candidates=1)
+    assert ranked == [("near", pytest.approx(0.5))]
+
+
+def test_replace_and_remove_keep_index_consistent():
+    from job_index import JobIndex
+
+    index = JobIndex()
+    index.add("a", *_job((1, 0, 0)))
+    index.add("b", *_job((0, 1, 0)))
+    index.add("a", *_job((0, 0, 1)))
+
+    assert len(index) == 2
+    assert index.remove("b")
+    assert not index.remove("b")
+    assert index.search({"skills": _vec(0, 0, 1)}, k=5, weights=WEIGHTS) == [("a", pytest.approx(0.5))]
+
+
+def test_index_persists_across_instances(tmp_path):
+    from job_index import JobIndex
+
+    path = str(tmp_path / "jobs.sqlite3")
+    index = JobIndex(path)
+    for i in range(20):
+        index.add(f"job{i}", *_job((1, i, 0)))
+    index.remove("job3")
+
+    reloaded = JobIndex(path)
+    assert len(reloaded) == 19
+    assert "job3" not in reloaded
+    assert reloaded.get("job0").skills == ["s"]
+    assert reloaded.search({"skills": _vec(1, 0, 0)}, k=1, weights=WEIGHTS)[0][0] == "job0"
+
+
+def test_instances_sharing_a_database_see_each_others_writes(tmp_path):
+    from job_index import JobIndex
+
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = JobIndex(path), JobIndex(path)
+    first.add("a", *_job((1, 0, 0)))
+    second.add("b", *_job((0, 1, 0)))
+
+    assert "b" in first and "a" in second
+    assert second.search({"skills": _vec(1, 0, 0)}, k=1, weights=WEIGHTS)[0][0] == "a"
+
+    first.remove("a")
+    assert "a" not in second
+    assert len(second) == 1
+
+
+def test_jobs_from_another_embedding_backend_wait_for_reencode(tmp_path):
+    from job_index import JobIndex
+
+    path = str(tmp_path / "jobs.sqlite3")
+    requirements, embeddings = _job((1, 0, 0))
+    JobIndex(path, namespace="torch").add("a", requirements, embeddings)
+
+    index = JobIndex(path, namespace="onnx")
+    assert "a" in index
+    assert index.stale() == [("a", requirements)]
+    assert index.search({"skills": _vec(0, 1, 0)}, k=1, weights=WEIGHTS) == []
+
+    assert index.reencode("a", requirements, {"skills": _vec(0, 1, 0)})
+    assert index.stale() == []
+    assert index.search({"skills": _vec(0, 1, 0)}, k=1, weights=WEIGHTS) == [("a", pytest.approx(0.5))]
+    # Stored again under the new namespace.
+    assert JobIndex(path, namespace="onnx").stale() == []
+
+
+def test_reencode_skips_jobs_replaced_meanwhile(tmp_path):
+    from job_index import JobIndex
+
+    path = str(tmp_path / "jobs.sqlite3")
+    requirements, embeddings = _job((1, 0, 0))
+    JobIndex(path, namespace="torch").add("a", requirements, embeddings)
+    index = JobIndex(path, namespace="onnx")
+    [(job_id, stale_requirements)] = index.stale()
+
+    JobIndex(path, namespace="onnx").add("a", *_job((0, 0, 1)))
+    assert not index.reencode(job_id, stale_requirements, {"skills": _vec(0, 1, 0)})
+    assert index.search({"skills": _vec(0, 0, 1)}, k=1, weights=WEIGHTS) == [("a", pytest.approx(0.5))]
+
+
+def test_own_writes_are_not_read_back_from_the_database(tmp_path, monkeypatch):
+    from job_index import JobIndex
+
+    path = str(tmp_path / "jobs.sqlite3")
+    index, other = JobIndex(path), JobIndex(path)
+    reads = []
+    original_rows = index._rows
+    monkeypatch.setattr(index, "_rows", lambda conn, job_ids: reads.extend(job_ids) or original_rows(conn, job_ids))
+
+    index.add("a", *_job((1, 0, 0)))
+    index.remove("a")
+    index.add("b", *_job((0, 1, 0)))
+    assert len(index) == 1
+    assert reads == []
+
+    other.add("c", *_job((0, 0, 1)))
+    index.add("d", *_job((1, 1, 0)))
+    assert reads == ["c"]
+    assert len(index) == 3 and "d" in other
@@ -0,0 +1,131 @@
+def test_cache_roundtrip_and_ttl(tmp_path, monkeypatch):
+    import llm_cache
+
+    cache = llm_cache.LLMResultCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=60)
+    cache.set("k", '{"skills": ["python"]}')
+    assert cache.get("k") == '{"skills": ["python"]}'
+
+    now = llm_cache.time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 61)
+    assert cache.get("k") is None
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_concurrent_get_llm_cache_builds_one_cache(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    import time
+
+    import llm_cache
+
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    built = []
+    init = llm_cache.LLMResultCache.__init__
+
+    def slow_init(self, *args, **kwargs):
+        built.append(self)
+        time.sleep(0.05)
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(llm_cache.LLMResultCache, "__init__", slow_init)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        caches = list(pool.map(lambda _: llm_cache.get_llm_cache(), range(4)))
+
+    assert len(built) == 1
+    assert all(cache is built[0] for cache in caches)
+
+
+def test_prune_keeps_newest_entries(tmp_path, monkeypatch):
+    import llm_cache
+
+    cache = llm_cache.LLMResultCache(str(tmp_path / "llm.sqlite3"), max_entries=2)
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(llm_cache.time, "time", lambda: next(clock))
+    for key in ["a", "b", "c"]:
+        cache.set(key, "{}")
+    cache.prune()
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "{}"
+    assert cache.get("c") == "{}"
+
+
+def test_make_key_depends_on_every_input():
+    from llm_cache import make_key
+
+    base = make_key("m", "prompt", 0.5)
+    assert base == make_key("m", "prompt", 0.5)
+    assert base != make_key("m2", "prompt", 0.5)
+    assert base != make_key("m", "prompt2", 0.5)
+    assert base != make_key("m", "prompt", 0.0)
+
+
+def test_process_chunk_served_from_cache_unless_bypassed(tmp_path, monkeypatch):
+    import external_model
+    import llm_cache
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+
+    calls = []
+
+    def generator(prompt, output_type, temperature):
+        calls.append(prompt)
+        return '{"skills": ["python"], "experiences": [], "qualifications": []}'
+
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10)
+    ex.generator = generator
+
+    assert ex.process_chunk("chunk").skills == ["python"]
+    assert ex.process_chunk("chunk").skills == ["python"]
+    assert len(calls) == 1
+
+    with llm_cache.bypass():
+        ex.process_chunk("chunk")
+    assert len(calls) == 2
+
+
+def test_failed_generation_is_not_cached(tmp_path, monkeypatch):
+    import external_model
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+
+    responses = iter(["not json", '{"skills": ["go"]}'])
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=10)
+    ex.generator = lambda *args, **kwargs: next(responses)
+
+    assert ex.process_chunk("chunk").skills == []
+    assert ex.process_chunk("chunk").skills == ["go"]
+
+
+def test_section_chunking_reextracts_only_edited_sections(tmp_path, monkeypatch):
+    import external_model
+
+    monkeypatch.setenv("EXTERNAL_LLM_API_KEY", "x")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(external_model.ExternalLLMExtractor, "_load_model", lambda self: None)
+
+    calls = []
+
+    def generator(prompt, output_type, temperature):
+        calls.append(prompt)
+        return '{"skills": ["python"], "experiences": [], "qualifications": []}'
+
+    ex = external_model.ExternalLLMExtractor(model_name="m", chunk_size=1000, section_size=100)
+    ex.generator = generator
+
+    lines = [f"- Requirement number {i} with some detail." for i in range(60)]
+    text = "# Acme GmbH\n\n" + "\n".join(lines) + "\n"
+    ex.process_text(text)
+    first_run = len(calls)
+    assert first_run > 1
+
+    calls.clear()
+    edited = "# Acme GmbH\n\n" + "\n".join(lines[:30] + ["- Posted on 2026-10-18."] + lines[30:]) + "\n"
+    assert ex.process_text(edited).skills == ["python"]
+    assert 1 <= len(calls) <= 3 < first_run
+    assert any("Posted on 2026-10-18" in prompt for prompt in calls)
@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+import pytest
+
+
+def _build_tiny_model(path):
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    words = "<pad> <eos> <unk> extract the requirements from job python java docker skills must have years".split()
+    tok = Tokenizer(models.WordLevel({w: i for i, w in enumerate(words)}, unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    transformers.PreTrainedTokenizerFast(
+        tokenizer_object=tok, pad_token="<pad>", eos_token="<eos>", unk_token="<unk>"
+    ).save_pretrained(path)
+
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(
+        vocab_size=len(words), hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=128,
+        pad_token_id=0, eos_token_id=1, bos_token_id=1,
+    )
+    transformers.LlamaForCausalLM(config).save_pretrained(path)
+    return str(path)
+
+
+def test_prefix_cached_batch_matches_uncached_generation(tmp_path):
+    from local_llm import PrefixCachedGenerator
+
+    model_path = _build_tiny_model(tmp_path)
+    prefix = "extract the requirements from job "
+    prompts = [prefix + "python docker", prefix + "java must have years skills", prefix + "docker"]
+
+    cached = PrefixCachedGenerator(model_path, prompt_prefix=prefix, max_new_tokens=6)
+    plain = PrefixCachedGenerator(model_path, max_new_tokens=6)
+
+    assert cached.generate(prompts) == [plain.generate([p])[0] for p in prompts]
+
+
+class FakeGenerator:
+    calls = []
+
+    def __init__(self, model_id, prompt_prefix="", device_kwargs=None, max_new_tokens=1024):
+        self.prompt_prefix = prompt_prefix
+
+    def generate(self, prompts):
+        FakeGenerator.calls.append(list(prompts))
+        return [json.dumps({"skills": [p.rsplit("SKILL:", 1)[-1].split()[0]]}) for p in prompts]
+
+
+def test_local_extractor_batches_concurrent_chunks(monkeypatch):
+    import base_model
+    import local_llm
+
+    FakeGenerator.calls = []
+    monkeypatch.setattr(local_llm, "PrefixCachedGenerator", FakeGenerator)
+    monkeypatch.setenv("LLM_LOCAL_BATCH_WAIT_MS", "200")
+
+    ex = base_model.LLMExtractor(model_id="local", chunk_size=100, max_batch_size=8)
+    try:
+        # The cached prefix is the template text before the chunk.
+        assert ex.generator.prompt_prefix
+        assert ex._chunk_prompt("x").startswith(ex.generator.prompt_prefix)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            a, b = pool.map(ex.process_chunks, [["SKILL:python", "SKILL:java"], ["SKILL:docker"]])
+
+        assert [r.skills for r in a] == [["python"], ["java"]]
+        assert [r.skills for r in b] == [["docker"]]
+        assert len(FakeGenerator.calls) == 1 and len(FakeGenerator.calls[0]) == 3
+    finally:
+        ex._batcher.close()
+
+
+def test_local_extractor_splits_oversized_batches_and_falls_back_on_bad_json(monkeypatch):
+    import base_model
+    import local_llm
+
+    FakeGenerator.calls = []
+    monkeypatch.setattr(local_llm, "PrefixCachedGenerator", FakeGenerator)
+
+    ex = base_model.LLMExtractor(model_id="local", chunk_size=100, max_batch_size=2)
+    ex.generator.generate = lambda prompts: FakeGenerator.calls.append(prompts) or ["not json"] * len(prompts)
+    try:
+        results = ex.process_chunks(["a", "b", "c"])
+        assert [r.skills for r in results] == [[], [], []]
+        assert [len(call) for call in FakeGenerator.calls] == [2, 1]
+    finally:
+        ex._batcher.close()
+
+
+def test_local_extractor_serves_repeated_chunks_from_llm_cache(tmp_path, monkeypatch):
+    import base_model
+    import local_llm
+
+    FakeGenerator.calls = []
+    monkeypatch.setattr(local_llm, "PrefixCachedGenerator", FakeGenerator)
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm.sqlite3"))
+
+    ex = base_model.LLMExtractor(model_id="local", chunk_size=100)
+    try:
+        ex.process_chunks(["SKILL:python", "SKILL:java"])
+        results = ex.process_chunks(["SKILL:python", "SKILL:go"])
+
+        assert [r.skills for r in results] == [["python"], ["go"]]
+        assert [len(call) for call in FakeGenerator.calls] == [2, 1]
+    finally:
+        ex._batcher.close()
@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class FakeEncoding:
+    def __init__(self, ids):
+        self.ids = ids + [0] * (3 - len(ids))
+        self.attention_mask = [1] * len(ids) + [0] * (3 - len(ids))
+        self.type_ids = [0] * 3
+
+
+class FakeTokenizer:
+    def encode_batch(self, sentences):
+        return [FakeEncoding([len(word) for word in s.split()]) for s in sentences]
+
+
+class FakeSession:
+    def __init__(self):
+        self.batches = []
+
+    def run(self, outputs, feeds):
+        self.batches.append(feeds["input_ids"].shape[0])
+        ids = feeds["input_ids"].astype(np.float32)
+        # Token embedding = (id, 1); padding tokens get a large value that pooling must ignore.
+        return [np.stack([np.where(ids > 0, ids, 100.0), np.ones_like(ids)], axis=-1)]
+
+
+def _encoder(batch_size=32):
+    from onnx_encoder import OnnxSentenceEncoder
+
+    encoder = OnnxSentenceEncoder.__new__(OnnxSentenceEncoder)
+    encoder.session = FakeSession()
+    encoder.input_names = {"input_ids", "attention_mask"}
+    encoder.tokenizer = FakeTokenizer()
+    encoder.batch_size = batch_size
+    return encoder
+
+
+def test_encode_mean_pools_over_attention_mask_and_normalizes():
+    out = _encoder().encode(["ab cdef", "abc"])
+
+    expected = np.array([[3.0, 1.0], [3.0, 1.0]]) / np.sqrt(10.0)
+    assert out.dtype == np.float32
+    assert np.allclose(out, expected)
+
+
+def test_encode_keeps_input_order_across_length_sorted_batches():
+    encoder = _encoder(batch_size=1)
+    out = encoder.encode(["a", "abcd efgh ijkl", "ab"])
+
+    assert encoder.session.batches == [1, 1, 1]
+    assert np.allclose(out[:, 0] / out[:, 1], [1.0, 4.0, 2.0])
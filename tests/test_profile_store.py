@@ -0,0 +1,108 @@
+import numpy as np
+
+
+def _vectors(**by_text):
+    return {text: np.array(v, dtype=np.float32) for text, v in by_text.items()}
+
+
+def test_put_reports_missing_items_and_reuses_stored_vectors():
+    from api_schema import UserProfile
+    from profile_store import ProfileStore
+
+    store = ProfileStore()
+    profile = UserProfile(skills=["python", "sql"], experiences=["backend"])
+
+    assert store.put("u", profile, {}) == ["python", "sql", "backend"]
+    assert "u" not in store
+    assert store.put("u", profile, _vectors(python=[2, 0], sql=[0, 1], backend=[1, 1])) == []
+
+    updated = UserProfile(skills=["python", "sql", "docker"], experiences=["backend"])
+    assert store.put("u", updated, {}) == ["docker"]
+    assert store.put("u", updated, _vectors(docker=[1, 0])) == []
+
+    embeddings = store.embeddings("u")
+    np.testing.assert_allclose(embeddings["skills"], [[1, 0], [0, 1], [1, 0]])
+    np.testing.assert_allclose(embeddings["experiences"], [[np.sqrt(0.5), np.sqrt(0.5)]])
+    assert "qualifications" not in embeddings
+
+
+def test_profiles_persist_and_remove(tmp_path):
+    from api_schema import UserProfile
+    from profile_store import ProfileStore
+
+    path = str(tmp_path / "profiles.sqlite3")
+    store = ProfileStore(path)
+    store.put("u", UserProfile(skills=["python"]), _vectors(python=[0, 3]))
+    store.put("v", UserProfile(skills=["java"]), _vectors(java=[1, 0]))
+    assert store.remove("v")
+    assert not store.remove("v")
+
+    reloaded = ProfileStore(path)
+    assert len(reloaded) == 1
+    assert reloaded.get("u") == UserProfile(skills=["python"])
+    np.testing.assert_allclose(reloaded.embeddings("u")["skills"], [[0, 1]])
+
+
+def test_stores_sharing_a_database_see_each_others_writes(tmp_path):
+    from api_schema import UserProfile
+    from profile_store import ProfileStore
+
+    path = str(tmp_path / "profiles.sqlite3")
+    first, second = ProfileStore(path), ProfileStore(path)
+    first.put("u", UserProfile(skills=["python"]), _vectors(python=[0, 3]))
+
+    assert second.get("u") == UserProfile(skills=["python"])
+    assert second.put("u", UserProfile(skills=["python", "sql"]), {}) == ["sql"]
+
+    first.remove("u")
+    assert "u" not in second
+
+
+def test_profiles_from_another_embedding_backend_wait_for_reencode(tmp_path):
+    from api_schema import UserProfile
+    from profile_store import ProfileStore
+
+    path = str(tmp_path / "profiles.sqlite3")
+    profile = UserProfile(skills=["python"])
+    ProfileStore(path, namespace="torch").put("u", profile, _vectors(python=[0, 3]))
+
+    store = ProfileStore(path, namespace="onnx")
+    assert store.get_with_embeddings("u") == (profile, None)
+    assert store.stale() == [("u", profile)]
+    # The stale vectors are not reused for an update.
+    assert store.put("u", profile, {}) == ["python"]
+
+    assert store.reencode("u", profile, {"skills": np.array([[2, 0]], dtype=np.float32)})
+    assert store.stale() == []
+    np.testing.assert_allclose(store.embeddings("u")["skills"], [[1, 0]])
+    np.testing.assert_allclose(ProfileStore(path, namespace="onnx").embeddings("u")["skills"], [[1, 0]])
+
+
+def test_reencode_skips_profiles_replaced_meanwhile(tmp_path):
+    from api_schema import UserProfile
+    from profile_store import ProfileStore
+
+    path = str(tmp_path / "profiles.sqlite3")
+    old = UserProfile(skills=["python"])
+    ProfileStore(path, namespace="torch").put("u", old, _vectors(python=[0, 3]))
+    store = ProfileStore(path, namespace="onnx")
+    [(_, stale)] = store.stale()
+
+    new = UserProfile(skills=["rust"])
+    ProfileStore(path, namespace="onnx").put("u", new, _vectors(rust=[1, 0]))
+    assert not store.reencode("u", stale, {"skills": np.array([[0, 1]], dtype=np.float32)})
+    assert store.get("u") == new
+    np.testing.assert_allclose(store.embeddings("u")["skills"], [[1, 0]])
+
+
+def test_get_with_embeddings_returns_a_matching_pair():
+    from api_schema import UserProfile
+    from profile_store import ProfileStore
+
+    store = ProfileStore()
+    assert store.get_with_embeddings("u") == (None, None)
+    store.put("u", UserProfile(skills=["python"]), _vectors(python=[0, 3]))
+
+    profile, embeddings = store.get_with_embeddings("u")
+    assert profile == UserProfile(skills=["python"])
+    np.testing.assert_allclose(embeddings["skills"], [[0, 1]])
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="fork and /proc are Linux-only")
+
+
+def test_process_memory_reports_private_pages():
+    from metrics import process_memory
+
+    mem = process_memory()
+    assert set(mem) == {"rss", "pss", "uss"}
+    assert 0 < mem["uss"] <= mem["pss"] <= mem["rss"]
+    assert process_memory(pid=2**22 + 1) == {}
+
+
+def test_supervise_forks_workers_and_restarts_crashed_ones(tmp_path):
+    import serve
+
+    def target():
+        with open(tmp_path / f"{os.getpid()}.started", "w"):
+            pass
+        crash_marker = tmp_path / "crashed"
+        if not crash_marker.exists():
+            crash_marker.touch()
+            raise RuntimeError("first worker dies")
+
+    serve.supervise(2, target, report_interval=0, poll_interval=0.01)
+
+    started = list(tmp_path.glob("*.started"))
+    # Two workers, one of which crashed and was replaced.
+    assert len(started) == 3
+    assert str(os.getpid()) not in {p.stem for p in started}
+
+
+def test_crashing_worker_reports_its_traceback(capfd):
+    import serve
+
+    def target():
+        raise RuntimeError("worker failed to start")
+
+    _, status = os.waitpid(serve.fork_worker(target), 0)
+
+    assert os.waitstatus_to_exitcode(status) == 1
+    assert "RuntimeError: worker failed to start" in capfd.readouterr().err
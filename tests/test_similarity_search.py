@@ -1,4 +1,7 @@
-import torch
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
 
 
 def test_compute_maxsim_empty_lists_returns_zero():
@@ -22,51 +25,354 @@ def test_compute_maxsim_uses_rowwise_max_then_mean(monkeypatch):
 
     def fake_cos_sim(job, user):
         # shape (job, user)
-        return torch.tensor(
+        return np.array(
             [
                 [0.1, 0.7, 0.2],
                 [0.3, 0.4, 0.9],
             ]
         )
 
-    monkeypatch.setattr(similarity_search.util, "cos_sim", fake_cos_sim)
+    monkeypatch.setattr(similarity_search, "_cos_sim", fake_cos_sim)
 
     score = similarity_search.compute_maxsim(["u1", "u2", "u3"], ["j1", "j2"], FakeModel())
     assert abs(score - 0.8) < 1e-6
 
 
+class LookupModel:
+    """Fake encoder with fixed vectors per string that records each encode call."""
+
+    vectors = {
+        "python": [1.0, 0.0, 0.0],
+        "java": [0.8, 0.6, 0.0],
+        "2y": [0.0, 1.0, 0.0],
+        "5y": [0.0, 0.6, 0.8],
+        "bs": [0.0, 0.0, 1.0],
+    }
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, items, convert_to_tensor=True):
+        self.calls.append(list(items))
+        return torch.tensor([self.vectors[item] for item in items])
+
+
 def test_compute_similarity_default_weights(monkeypatch):
     import similarity_search
     from api_schema import Requirements, UserProfile
 
-    monkeypatch.setattr(similarity_search, "get_model", lambda: object())
+    model = LookupModel()
+    monkeypatch.setattr(similarity_search, "get_model", lambda: model)
 
-    def fake_compute_maxsim(user_items, job_items, model):
-        mapping = {"skills": 0.6, "experiences": 0.2, "qualifications": 0.0}
-        if user_items is user_profile.skills:
-            return mapping["skills"]
-        if user_items is user_profile.experiences:
-            return mapping["experiences"]
-        return mapping["qualifications"]
+    user_profile = UserProfile(skills=["python"], experiences=["2y"], qualifications=["bs"])
+    req = Requirements(skills=["python", "java"], experiences=["5y"], qualifications=[])
 
-    monkeypatch.setattr(similarity_search, "compute_maxsim", fake_compute_maxsim)
+    result = similarity_search.compute_similarity(user_profile, req)
+    assert abs(result.score - (0.9 * 0.5 + 0.6 * 0.3 + 0.0 * 0.2)) < 1e-6
 
-    user_profile = UserProfile(skills=["python"], experiences=["2y"], qualifications=["bs"])
-    req = Requirements(skills=["python"], experiences=["2y"], qualifications=[])
+
+def test_compute_similarity_encodes_once_and_matches_per_field_maxsim(monkeypatch):
+    import similarity_search
+    from api_schema import Requirements, UserProfile
+
+    model = LookupModel()
+    monkeypatch.setattr(similarity_search, "get_model", lambda: model)
+
+    user_profile = UserProfile(skills=["python", "java"], experiences=["2y"], qualifications=["bs"])
+    req = Requirements(skills=["java"], experiences=["5y", "2y"], qualifications=["bs", "python"])
 
     result = similarity_search.compute_similarity(user_profile, req)
-    assert abs(result.score - (0.6 * 0.5 + 0.2 * 0.3 + 0.0 * 0.2)) < 1e-9
+
+    assert len(model.calls) == 1
+    assert sorted(model.calls[0]) == ["2y", "5y", "bs", "java", "python"]
+
+    expected = sum(
+        similarity_search.compute_maxsim(getattr(user_profile, f), getattr(req, f), model) * w
+        for f, w in {"skills": 0.5, "experiences": 0.3, "qualifications": 0.2}.items()
+    )
+    assert abs(result.score - expected) < 1e-6
 
 
 def test_compute_similarity_custom_weights_missing_keys(monkeypatch):
     import similarity_search
     from api_schema import Requirements, UserProfile
 
-    monkeypatch.setattr(similarity_search, "get_model", lambda: object())
-    monkeypatch.setattr(similarity_search, "compute_maxsim", lambda *args, **kwargs: 1.0)
+    monkeypatch.setattr(similarity_search, "get_model", lambda: LookupModel())
+    monkeypatch.setattr(similarity_search, "_maxsim", lambda *args, **kwargs: 1.0)
 
-    user_profile = UserProfile(skills=["a"], experiences=["b"], qualifications=["c"])
-    req = Requirements(skills=["a"], experiences=["b"], qualifications=["c"])
+    user_profile = UserProfile(skills=["python"], experiences=["2y"], qualifications=["bs"])
+    req = Requirements(skills=["python"], experiences=["2y"], qualifications=["bs"])
 
     result = similarity_search.compute_similarity(user_profile, req, weights={"skills": 1.0})
     assert result.score == 1.0
+
+
+def test_managed_model_encodes_repeated_strings_once(monkeypatch):
+    import similarity_search
+
+    calls = []
+
+    class FakeModel:
+        def encode(self, items, convert_to_tensor=True):
+            calls.append(list(items))
+            return torch.ones((len(items), 3))
+
+    monkeypatch.setattr(similarity_search, "_model", FakeModel())
+    model = similarity_search.get_model()
+
+    similarity_search.compute_maxsim(["python"], ["python", "java"], model)
+    similarity_search.compute_maxsim(["python"], ["java"], model)
+
+    assert calls == [["python"], ["java"]]
+
+
+def test_compute_similarity_batch_matches_per_profile_scores(monkeypatch):
+    import similarity_search
+    from api_schema import Requirements, UserProfile
+
+    model = LookupModel()
+    monkeypatch.setattr(similarity_search, "get_model", lambda: model)
+
+    profiles = [
+        UserProfile(skills=["python", "java"], experiences=["2y"], qualifications=["bs"]),
+        UserProfile(skills=["java"], experiences=[], qualifications=[]),
+        UserProfile(),
+    ]
+    req = Requirements(skills=["python", "java"], experiences=["5y", "2y"], qualifications=["bs"])
+
+    batch = similarity_search.compute_similarity_batch(profiles, req)
+
+    assert len(model.calls) == 1
+    expected = [similarity_search.compute_similarity(p, req).score for p in profiles]
+    assert [s.score for s in batch] == [pytest.approx(e, abs=1e-6) for e in expected]
+    assert batch[2].score == 0.0
+
+
+def test_embedding_batcher_coalesces_concurrent_callers():
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+
+    from similarity_search import EmbeddingBatcher
+
+    batches = []
+
+    def encode(texts):
+        batches.append(list(texts))
+        return np.array([[float(len(t))] for t in texts])
+
+    batcher = EmbeddingBatcher(encode, max_batch_size=100, max_wait_ms=200)
+    try:
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(batcher.encode, [["a", "bb"], ["bb", "ccc"], ["dddd"]]))
+    finally:
+        batcher.close()
+
+    assert len(batches) == 1
+    assert sorted(batches[0]) == ["a", "bb", "ccc", "dddd"]
+    assert [r.ravel().tolist() for r in results] == [[1.0, 2.0], [2.0, 3.0], [4.0]]
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["mean_batch_size"] == 4
+    assert batcher.stats()["queue_depth"] == 0
+
+
+def test_embedding_queue_depth_gauge_reads_the_shared_batcher(monkeypatch):
+    import threading
+
+    import numpy as np
+
+    from prometheus_client import REGISTRY
+
+    import similarity_search
+    from similarity_search import EmbeddingBatcher
+
+    def depth():
+        return REGISTRY.get_sample_value("jobmatcher_embedding_queue_depth")
+
+    monkeypatch.delenv("EMBEDDING_BATCH_MAX_WAIT_MS", raising=False)
+    monkeypatch.setattr(similarity_search, "_embedding_batcher", None)
+    assert depth() == 0
+
+    release = threading.Event()
+    batcher = EmbeddingBatcher(lambda texts: release.wait() and np.zeros((len(texts), 1)),
+                               max_batch_size=1, max_wait_ms=1)
+    monkeypatch.setattr(similarity_search, "_embedding_batcher", batcher)
+    callers = [threading.Thread(target=batcher.encode, args=([text],)) for text in "abc"]
+    try:
+        for caller in callers:
+            caller.start()
+        # One request is being encoded, the other two wait in the queue.
+        for _ in range(500):
+            if depth() == 2:
+                break
+            threading.Event().wait(0.01)
+        assert depth() == 2
+    finally:
+        release.set()
+        for caller in callers:
+            caller.join()
+        batcher.close()
+
+
+def test_embedding_batcher_flushes_when_batch_is_full():
+    import time
+
+    import numpy as np
+
+    from similarity_search import EmbeddingBatcher
+
+    batcher = EmbeddingBatcher(lambda texts: np.zeros((len(texts), 1)), max_batch_size=2, max_wait_ms=10_000)
+    try:
+        start = time.monotonic()
+        assert batcher.encode(["a", "b"]).shape == (2, 1)
+        assert time.monotonic() - start < 5
+    finally:
+        batcher.close()
+
+
+def test_embedding_batcher_propagates_errors():
+    from similarity_search import EmbeddingBatcher
+
+    def encode(texts):
+        raise RuntimeError("oom")
+
+    batcher = EmbeddingBatcher(encode, max_batch_size=1, max_wait_ms=1)
+    try:
+        with pytest.raises(RuntimeError, match="oom"):
+            batcher.encode(["a"])
+    finally:
+        batcher.close()
+
+
+def test_embedding_batcher_fails_callers_when_results_do_not_fit_and_keeps_running():
+    from similarity_search import EmbeddingBatcher
+
+    def encode(texts):
+        # One row too few: selecting the caller's rows fails after encoding.
+        return np.zeros((len(texts) - 1, 3), dtype=np.float32) if len(texts) > 1 else np.ones((1, 3))
+
+    batcher = EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=1)
+    try:
+        with pytest.raises(IndexError):
+            batcher.encode(["a", "b"])
+        np.testing.assert_allclose(batcher.encode(["c"]), [[1, 1, 1]])
+    finally:
+        batcher.close()
+
+
+def test_encode_texts_routes_managed_model_through_batcher(monkeypatch):
+    import similarity_search
+
+    calls = []
+
+    class FakeModel:
+        def encode(self, items, convert_to_tensor=True):
+            calls.append(list(items))
+            return torch.ones((len(items), 2))
+
+    monkeypatch.setenv("EMBEDDING_CACHE_SIZE", "0")
+    monkeypatch.setenv("EMBEDDING_BATCH_MAX_WAIT_MS", "1")
+    monkeypatch.setattr(similarity_search, "_model", FakeModel())
+
+    out = similarity_search.encode_texts(["x", "y"], similarity_search.get_model())
+
+    assert out.shape == (2, 2)
+    assert calls == [["x", "y"]]
+    assert similarity_search.get_embedding_batcher().stats()["batches"] == 1
+
+
+def test_max_score_drift_compares_backends():
+    import similarity_search
+    from api_schema import Requirements, UserProfile
+
+    class ShiftedModel(LookupModel):
+        vectors = {**LookupModel.vectors, "java": [1.0, 0.0, 0.0]}
+
+    pairs = [
+        (UserProfile(skills=["python"]), Requirements(skills=["java"])),
+        (UserProfile(skills=["bs"]), Requirements(skills=["bs"])),
+    ]
+
+    assert similarity_search.max_score_drift(pairs, LookupModel(), LookupModel()) == 0.0
+    assert similarity_search.max_score_drift(pairs, ShiftedModel(), LookupModel()) == pytest.approx(0.5 * 0.2)
+
+
+def test_get_model_rejects_unknown_backend(monkeypatch):
+    import similarity_search
+
+    monkeypatch.setenv("EMBEDDING_BACKEND", "tensorflow")
+    with pytest.raises(ValueError):
+        similarity_search.get_model()
+
+
+class DedupModel:
+    vectors = {
+        "Python programming": [0.95, 0.31, 0.0],
+        "Python": [1.0, 0.0, 0.0],
+        "Java": [0.0, 1.0, 0.0],
+    }
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, items):
+        self.calls.append(list(items))
+        return np.array([self.vectors[item] for item in items], dtype=np.float32)
+
+
+def test_dedupe_requirements_keeps_one_canonical_item_per_cluster(monkeypatch):
+    import similarity_search
+    from api_schema import Requirements
+
+    model = DedupModel()
+    monkeypatch.setattr(similarity_search, "get_model", lambda: model)
+
+    req = Requirements(skills=["Python programming", "Python", "python.", "Java", "  Java "],
+                       experiences=["3 years backend"], qualifications=[])
+
+    result = similarity_search.dedupe_requirements(req, threshold=0.9)
+    # The shortest item of a cluster is canonical; kept items stay in input order.
+    assert result.skills == ["Python", "Java"]
+    assert result.experiences == ["3 years backend"]
+    # Exact repeats are dropped before encoding; single-item fields are not encoded.
+    assert model.calls == [["Python programming", "Python", "Java"]]
+
+    strict = similarity_search.dedupe_requirements(req, threshold=0.99)
+    assert strict.skills == ["Python programming", "Python", "Java"]
+
+
+def test_check_backend_names_the_missing_extra(monkeypatch):
+    import importlib.util
+
+    import similarity_search
+
+    monkeypatch.setenv("EMBEDDING_BACKEND", "onnx-int8")
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None if name == "onnxruntime" else object())
+
+    with pytest.raises(RuntimeError, match=r"'onnx' extra \(missing: onnxruntime\).*uv sync --extra onnx"):
+        similarity_search.check_backend()
+
+    monkeypatch.setenv("EMBEDDING_BACKEND", "torch")
+    assert similarity_search.check_backend() == "torch"
+
+
+def test_concurrent_get_model_loads_once(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    import time
+
+    import similarity_search
+
+    loads = []
+
+    def slow_load(backend):
+        loads.append(backend)
+        time.sleep(0.05)
+        return object()
+
+    monkeypatch.setattr(similarity_search, "load_model", slow_load)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        models = list(pool.map(lambda _: similarity_search.get_model(), range(4)))
+
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call_and_key_is_released():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+        again = await flights.do("k", work)
+        return results, again
+
+    results, again = asyncio.run(run())
+
+    assert results == ["result"] * 5
+    assert again == "result"
+    assert len(calls) == 2
+    assert flights.stats() == {"started": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_propagate_to_every_waiter():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", work) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert [str(e) for e in errors] == ["provider down"] * 3
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("k", work))
+        second = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_cancelling_the_only_waiter_cancels_the_shared_call():
+    flights = SingleFlight()
+    events = []
+
+    async def work():
+        try:
+            await asyncio.sleep(1)
+            events.append("finished")
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    async def run():
+        caller = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        return flights.stats()
+
+    stats = asyncio.run(run())
+    assert events == ["cancelled"]
+    assert stats["in_flight"] == 0
@@ -26,3 +26,114 @@ def test_chunk_markdown_fallback_chunks_by_size_when_too_large():
 
     assert all(len(c) <= chunk_size * 4 for c in chunks)
     assert "".join(chunks) == text
+
+
+def test_map_chunks_preserves_order_when_concurrent():
+    import threading
+    import time
+
+    from utils import map_chunks
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fn(chunk):
+        # All three calls must be in flight at once to pass the barrier.
+        barrier.wait()
+        time.sleep(0.01 * (3 - chunk))
+        return chunk * 10
+
+    assert map_chunks(fn, [1, 2, 3], max_concurrency=3) == [10, 20, 30]
+
+
+def test_map_chunks_sequential_by_default():
+    from utils import map_chunks
+
+    assert map_chunks(str, [1, 2], max_concurrency=1) == ["1", "2"]
+
+
+def test_chunk_markdown_splits_oversized_section_at_sentences():
+    text = "# Intro\nFirst sentence here. Second sentence here. Third one.\n## Next\nBody\n"
+    chunks = chunk_markdown(text, chunk_size=8)  # 32 chars
+
+    assert "".join(chunks) == text
+    assert all(len(c) <= 32 for c in chunks)
+    assert chunks[0].startswith("# Intro\nFirst sentence here. ")
+    # Splits land after sentence punctuation, never mid-word.
+    assert all(c.endswith((". ", ".\n", "\n")) for c in chunks[:-1])
+
+
+def test_chunk_markdown_uses_custom_token_counter():
+    text = "# A\none two three four five six\n"
+    chunks = chunk_markdown(text, chunk_size=3, count_tokens=lambda s: len(s.split()))
+
+    assert chunks == ["# A\none ", "two three four ", "five six\n"]
+
+
+def test_chunk_markdown_overlap_repeats_trailing_pieces():
+    text = "One. Two. Three. Four."
+    chunks = chunk_markdown(text, chunk_size=2, count_tokens=lambda s: len(s.split()), overlap=1)
+
+    assert chunks == ["One. Two. ", "Two. Three. ", "Three. Four."]
+
+
+def test_load_token_counter_defaults_to_estimate():
+    from utils import approx_token_count, load_token_counter
+
+    assert load_token_counter(None) is approx_token_count
+    assert approx_token_count("x" * 8) == 2
+
+
+def test_concurrent_first_callers_load_the_tokenizer_once(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    import time
+
+    import utils
+
+    loads = []
+
+    def slow_load(name):
+        loads.append(name)
+        time.sleep(0.05)
+        return len
+
+    monkeypatch.setattr(utils, "_token_counters", {})
+    monkeypatch.setattr(utils, "_load_token_counter", slow_load)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        counters = list(pool.map(utils.load_token_counter, ["org/tokenizer"] * 4))
+
+    assert loads == ["org/tokenizer"]
+    assert all(counter is len for counter in counters)
+
+
+def _posting(lines):
+    return "# Acme GmbH\n\n" + "\n".join(lines) + "\n\n## Benefits\n\nRemote work. Free lunch. Gym membership.\n"
+
+
+def test_chunk_sections_is_lossless_and_bounded():
+    from utils import approx_token_count, chunk_sections
+
+    text = _posting([f"- Requirement number {i} with some detail." for i in range(60)])
+    chunks = chunk_sections(text, 100)
+
+    assert "".join(chunks) == text
+    assert len(chunks) > 5
+    assert all(approx_token_count(c) <= 100 for c in chunks)
+
+
+def test_chunk_sections_edit_only_changes_nearby_chunks():
+    from utils import chunk_sections, chunk_markdown
+
+    lines = [f"- Requirement number {i} with some detail." for i in range(60)]
+    edited = lines[:5] + ["- Experience with Terraform."] + lines[5:]
+
+    before = chunk_sections(_posting(lines), 100)
+    after = chunk_sections(_posting(edited), 100)
+    # The chunk holding the edit (possibly split in two) and at most one neighbour.
+    assert sum(chunk not in before for chunk in after) <= 3
+    assert after[-5:] == before[-5:]
+
+    # Greedy packing, for contrast, shifts every later boundary.
+    before = chunk_markdown(_posting(lines), 100)
+    after = chunk_markdown(_posting(edited), 100)
+    assert sum(chunk not in before for chunk in after) > 3
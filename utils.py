@@ -1,4 +1,47 @@
+from functools import lru_cache
+import hashlib
 import re
+import sqlite3
+import threading
+
+_token_counters = {}
+_token_counter_lock = threading.Lock()
+
+
+def connect_sqlite(path):
+    """Open a SQLite connection tuned for concurrent readers/writers across worker processes.
+
+    Connections must not be shared across threads; callers keep one per thread.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+
+@lru_cache(maxsize=None)
+def load_template(filename):
+    """Prompt template shipped next to this module."""
+    from pathlib import Path
+
+    from outlines import Template
+
+    return Template.from_file(str(Path(__file__).resolve().parent / filename))
+
+
+def clean_llm_response(response):
+    """Strip formatting noise some providers wrap around the JSON payload."""
+    response = response.replace("\n", "")
+    response = response.replace("<|return|>", "")
+    response = response.replace("```json", "")
+    response = response.replace("```", "")
+    return response
+
+
+def normalize_requirement_item(text):
+    """Comparison form of an item: case-folded, whitespace collapsed, list markers and trailing punctuation removed."""
+    return re.sub(r"\s+", " ", text).strip(" -*\u2022.,;:").casefold()
 
 
 def merge_requirements(a, b):
@@ -12,20 +55,214 @@ def merge_requirements(a, b):
     )
 
 
-def chunk_markdown(markdown_text, chunk_size):
-    chars_per_chunk = chunk_size * 4
-    chunks = re.split(r'(#{1,6}\s+.*?\n)', markdown_text)
+def merge_chunk_requirements(all_requirements):
+    """Union per-chunk Requirements into one (dedupe + sorted for determinism)."""
+    from collections import defaultdict
+
+    from api_schema import Requirements
+
+    merged = defaultdict(set)
+    for req in all_requirements:
+        merged["skills"].update(req.skills)
+        merged["experiences"].update(req.experiences)
+        merged["qualifications"].update(req.qualifications)
+
+    unique_requirements = {k: sorted(list(v)) for k, v in merged.items()}
+    return Requirements(**unique_requirements)
+
+
+def approx_token_count(text):
+    """Cheap token estimate (~4 characters per token) used when no tokenizer is available.
+
+    Fractional, so estimates of adjacent pieces add up to the estimate of their concatenation.
+    """
+    return len(text) / 4
+
+
+def load_token_counter(tokenizer_name=None):
+    """Token counter for a Hugging Face tokenizer id; falls back to ``approx_token_count``.
+
+    The tokenizer is fetched on first use, so this is cheap to call when no chunking happens.
+    Concurrent first callers wait for one load instead of each downloading it.
+    """
+    if not tokenizer_name:
+        return approx_token_count
+    counter = _token_counters.get(tokenizer_name)
+    if counter is None:
+        with _token_counter_lock:
+            counter = _token_counters.get(tokenizer_name)
+            if counter is None:
+                counter = _token_counters[tokenizer_name] = _load_token_counter(tokenizer_name)
+    return counter
+
+
+def _load_token_counter(tokenizer_name):
+    try:
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+    except Exception as e:
+        print(f"Could not load tokenizer {tokenizer_name}, estimating token counts: {e}")
+        return approx_token_count
+
+    def count_tokens(text):
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    return count_tokens
+
+
+# Progressively finer boundaries for splitting a section that does not fit in one chunk.
+# Each separator stays attached to the text before it, so joining the pieces restores the input.
+_SPLIT_PATTERNS = [
+    re.compile(r"\n[ \t]*\n\s*"),        # paragraphs
+    re.compile(r"(?<=[.!?])\s+"),         # sentences
+    re.compile(r"\n"),                    # lines
+    re.compile(r"\s+"),                   # words
+]
+
+
+def _split_after(text, pattern):
+    pieces, start = [], 0
+    for match in pattern.finditer(text):
+        if match.end() > start:
+            pieces.append(text[start:match.end()])
+            start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _fit_pieces(text, budget, count_tokens, level=0):
+    """Yield ``(piece, tokens)`` pairs of at most ``budget`` tokens that concatenate to ``text``."""
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        yield text, tokens
+        return
+
+    if level < len(_SPLIT_PATTERNS):
+        pieces = _split_after(text, _SPLIT_PATTERNS[level])
+        if len(pieces) == 1:
+            yield from _fit_pieces(text, budget, count_tokens, level + 1)
+            return
+        for piece in pieces:
+            yield from _fit_pieces(piece, budget, count_tokens, level + 1)
+        return
+
+    # A single unbreakable run: cut it at the character width that fits the budget.
+    width = max(1, int(len(text) * budget / tokens))
+    while width > 1 and count_tokens(text[:width]) > budget:
+        width = max(1, width * 9 // 10)
+    for i in range(0, len(text), width):
+        piece = text[i:i + width]
+        yield piece, count_tokens(piece)
+
+
+def chunk_markdown(markdown_text, chunk_size, count_tokens=None, overlap=0):
+    """Split markdown into chunks of at most ``chunk_size`` tokens.
+
+    Sections (a heading plus its body) are packed greedily into chunks. A section
+    that is larger than one chunk is split at paragraph, then sentence, line and
+    word boundaries. ``count_tokens`` defaults to ``approx_token_count``.
+    ``overlap`` repeats up to that many tokens of trailing pieces from one chunk
+    at the start of the next. Text is tokenized once per split level it passes
+    through (so up to five times for an oversized section, plus the width search
+    for unbreakable runs); packing and overlap reuse those counts. Without overlap
+    the chunks concatenate back to the input.
+    """
+    count_tokens = count_tokens or approx_token_count
+    sections = [s for s in re.split(r"(?m)^(?=#{1,6}\s)", markdown_text) if s]
+
     result_chunks = []
-    current_chunk = ""
-    for chunk in chunks:
-        if len(current_chunk) + len(chunk) < chars_per_chunk:
-            current_chunk += chunk
-        else:
-            if current_chunk:
-                result_chunks.append(current_chunk)
-            current_chunk = chunk
-    if current_chunk:
-        result_chunks.append(current_chunk)
-    if not result_chunks or min(len(c) for c in result_chunks) > chars_per_chunk:
-        result_chunks = [markdown_text[i:i + chars_per_chunk] for i in range(0, len(markdown_text), chars_per_chunk)]
+    current, current_tokens = [], 0
+    for section in sections:
+        for piece, tokens in _fit_pieces(section, chunk_size, count_tokens):
+            if current and current_tokens + tokens > chunk_size:
+                result_chunks.append("".join(p for p, _ in current))
+                carried, carried_tokens = [], 0
+                for prev, prev_tokens in reversed(current):
+                    if carried_tokens + prev_tokens > overlap or carried_tokens + prev_tokens + tokens > chunk_size:
+                        break
+                    carried.insert(0, (prev, prev_tokens))
+                    carried_tokens += prev_tokens
+                current, current_tokens = carried, carried_tokens
+            current.append((piece, tokens))
+            current_tokens += tokens
+    if current:
+        result_chunks.append("".join(p for p, _ in current))
     return result_chunks
+
+
+def _is_section_boundary(piece):
+    # About one piece in four, decided by its content alone.
+    return hashlib.blake2b(piece.encode("utf-8"), digest_size=2).digest()[0] % 4 == 0
+
+
+def chunk_sections(markdown_text, max_tokens, count_tokens=None, min_tokens=None):
+    """Split markdown into content-defined chunks for incremental extraction.
+
+    With chunk_markdown's greedy packing, one inserted line moves every later chunk
+    boundary. Here a boundary depends only on the nearby text. The text is cut into
+    paragraphs, split further (sentences, lines) into pieces of at most ``min_tokens``
+    (default a quarter of ``max_tokens``). Once the current chunk holds
+    ``min_tokens``, it ends before the next heading or before a piece whose hash
+    marks a boundary. It always ends before exceeding ``max_tokens``. An edit
+    therefore changes only the chunk around it, and sections shared between
+    postings are chunked alike. The chunks concatenate back to the input.
+    """
+    count_tokens = count_tokens or approx_token_count
+    min_tokens = max_tokens / 4 if min_tokens is None else min_tokens
+
+    result_chunks = []
+    current, current_tokens = [], 0
+    for section in (s for s in re.split(r"(?m)^(?=#{1,6}\s)", markdown_text) if s):
+        heading = True
+        for paragraph in _split_after(section, _SPLIT_PATTERNS[0]):
+            for piece, tokens in _fit_pieces(paragraph, max(min_tokens, 1), count_tokens):
+                boundary = heading or _is_section_boundary(piece)
+                if current and (current_tokens + tokens > max_tokens or (boundary and current_tokens >= min_tokens)):
+                    result_chunks.append("".join(current))
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += tokens
+                heading = False
+    if current:
+        result_chunks.append("".join(current))
+    return result_chunks
+
+
+def map_chunks(fn, chunks, max_concurrency=1):
+    """Apply ``fn`` to every chunk, running up to ``max_concurrency`` calls at once.
+
+    Results are returned in chunk order so callers can merge deterministically.
+    """
+    chunks = list(chunks)
+    if max_concurrency is None or max_concurrency <= 1 or len(chunks) <= 1:
+        return [fn(chunk) for chunk in chunks]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as pool:
+        return list(pool.map(fn, chunks))
+
+
+async def iter_chunks_as_completed(fn, chunks, max_concurrency=1):
+    """Run the coroutine function ``fn`` on every chunk and yield ``(index, result)`` as each one finishes.
+
+    At most ``max_concurrency`` calls are in flight. Calls still pending when the
+    consumer stops iterating (e.g. a client disconnect) are cancelled.
+    """
+    import asyncio
+
+    semaphore = asyncio.Semaphore(max(max_concurrency or 1, 1))
+
+    async def run(index, chunk):
+        async with semaphore:
+            return index, await fn(chunk)
+
+    tasks = [asyncio.ensure_future(run(i, chunk)) for i, chunk in enumerate(chunks)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()